@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Measure the construction of Transaction objects, with the assignment of
+their fields as done by ItemElement.
+
+Usage: baseobject.py [COUNT]
+"""
+from __future__ import print_function
+
+import sys
+import warnings
+from datetime import date
+from decimal import Decimal
+from time import time
+
+from weboob.capabilities.bank import Transaction
+
+
+def build(count):
+    """
+    Return durations of constructions and of fields assignments.
+    """
+    construction = assignment = 0
+    for i in range(count):
+        start = time()
+        tr = Transaction(u'%d' % i)
+        construction += time() - start
+
+        start = time()
+        tr.date = date(2015, 5, 20)
+        tr.rdate = date(2015, 5, 19)
+        tr.type = Transaction.TYPE_CARD
+        tr.raw = u'CB CAFE DU COIN 19/05'
+        tr.category = u'Food'
+        tr.label = u'CAFE DU COIN'
+        tr.amount = Decimal('-2.50')
+        assignment += time() - start
+    return construction, assignment
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    warnings.simplefilter('ignore')
+
+    construction, assignment = build(count)
+    print('%d transactions: construction %.2f s (%.1f us each), fields assignments %.2f s (%.1f us each)' % (
+          count, construction, construction * 1e6 / count, assignment, assignment * 1e6 / count))
+
+
+if __name__ == '__main__':
+    main()
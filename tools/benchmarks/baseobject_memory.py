@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Measure the memory used by capability objects, by building COUNT objects of
+each class in its own process.
+
+Usage: baseobject_memory.py [COUNT]
+"""
+from __future__ import print_function
+
+import resource
+import subprocess
+import sys
+
+
+CLASSES = (('weboob.capabilities.bank', 'Transaction'),
+           ('weboob.capabilities.housing', 'Housing'),
+           ('weboob.capabilities.video', 'BaseVideo'))
+
+
+def measure(module, name, count):
+    klass = getattr(__import__(module, fromlist=[name]), name)
+
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    objects = [klass(u'%d' % i) for i in range(count)]
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is in kilobytes
+    print('%-12s %6.2f MB for %d objects (%4d bytes each)' % (
+          name, (after - before) / 1024., len(objects), (after - before) * 1024. / count))
+
+
+def main():
+    if len(sys.argv) == 4:
+        measure(sys.argv[1], sys.argv[2], int(sys.argv[3]))
+        return
+
+    count = sys.argv[1] if len(sys.argv) > 1 else '50000'
+    for module, name in CLASSES:
+        subprocess.check_call([sys.executable, __file__, module, name, count])
+
+
+if __name__ == '__main__':
+    main()
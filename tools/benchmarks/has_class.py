@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Compare the native has-class() XPath function with the previous one, which
+evaluated a sub-expression on every tested node.
+
+Usage: has_class.py [ROWS] [LOOPS]
+"""
+from __future__ import print_function
+
+import sys
+from timeit import timeit
+
+import lxml.html as html
+
+from weboob.browser.pages import has_class
+
+
+def has_class_subxpath(context, *classes):
+    expressions = ' and '.join(["contains(concat(' ', normalize-space(@class), ' '), ' {0} ')".format(c) for c in classes])
+    xpath = 'self::*[@class and {0}]'.format(expressions)
+    return bool(context.context_node.xpath(xpath))
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    loops = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    doc = html.fromstring('<table>%s</table>' % ''.join(
+        '<tr class="row %s"><td>%d</td></tr>' % ('odd' if i % 2 else 'even', i) for i in range(rows)))
+    ns = html.etree.FunctionNamespace(None)
+    expr = html.etree.XPath('//tr[has-class("row", "odd")]')
+
+    for name, function in (('sub-xpath', has_class_subxpath), ('native', has_class)):
+        ns['has-class'] = function
+        assert len(expr(doc)) == rows // 2
+        duration = timeit(lambda: expr(doc), number=loops)
+        print('%-10s %8.2f ms per evaluation on %d rows' % (name, duration * 1000 / loops, rows))
+
+
+if __name__ == '__main__':
+    main()
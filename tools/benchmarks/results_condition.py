@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Compare the evaluation of a ResultsCondition on transactions with the same
+test written by hand.
+
+Usage: results_condition.py [OBJECTS] [REPEAT]
+"""
+from __future__ import print_function
+
+import random
+import sys
+from datetime import date
+from decimal import Decimal
+from timeit import repeat
+
+from weboob.capabilities.bank import Transaction
+from weboob.tools.application.results import ResultsCondition
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    loops = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    rand = random.Random(42)
+
+    transactions = []
+    for i in range(count):
+        tr = Transaction(u'%d' % i, backend='bank')
+        tr.date = date(2015, rand.randint(1, 12), rand.randint(1, 28))
+        tr.amount = Decimal(rand.randint(-10000, 10000)) / 100
+        tr.label = rand.choice([u'VIR SALAIRE', u'PRLV EDF', u'CB SNCF'])
+        transactions.append(tr)
+
+    condition = ResultsCondition('date>2015-06-01 AND amount<-20 OR label|EDF')
+    limit_date = date(2015, 6, 1)
+    limit_amount = Decimal('-20')
+
+    def by_hand(tr):
+        return (tr.date > limit_date and tr.amount < limit_amount) or u'EDF' in tr.label
+
+    results = {}
+    for name, test in (('condition', condition.is_valid), ('by hand', by_hand)):
+        duration = min(repeat(lambda: [tr for tr in transactions if test(tr)], number=1, repeat=loops))
+        results[name] = [tr for tr in transactions if test(tr)]
+        print('%-10s %8.2f µs per object (%d objects)' % (name, duration * 1e6 / count, count))
+
+    assert results['condition'] == results['by hand']
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Measure the startup of weboob applications with many configured backends,
+on a repository of generated bank modules.
+
+Two commands are timed, each in a new process:
+
+* boobank list: Weboob() and load_backends(CapBank), which creates and
+  checks the configuration of every backend, without using them;
+* weboob-config list: attributes, capabilities and configuration of every
+  configured module.
+
+The first run has no modules index, so every package is imported; next ones
+read the index built by the first run.
+
+Usage: startup.py [BACKENDS] [PAGES]
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+
+INIT = """from .module import Bank%(i)dModule
+
+__all__ = ['Bank%(i)dModule']
+"""
+
+MODULE = """from weboob.capabilities.bank import CapBank
+from weboob.tools.backend import Module, BackendConfig
+from weboob.tools.value import Value, ValueBackendPassword
+
+from .browser import Bank%(i)dBrowser
+
+
+class Bank%(i)dModule(Module, CapBank):
+    NAME = 'bank%(i)d'
+    MAINTAINER = u'John Doe'
+    EMAIL = 'john@example.org'
+    VERSION = '%(version)s'
+    DESCRIPTION = u'Bank %(i)d'
+    LICENSE = 'AGPLv3+'
+    CONFIG = BackendConfig(Value('login', label='Login'),
+                           ValueBackendPassword('password', label='Password'))
+    BROWSER = Bank%(i)dBrowser
+"""
+
+BROWSER = """from weboob.browser import LoginBrowser, URL
+
+from .pages import %(pages)s
+
+
+class Bank%(i)dBrowser(LoginBrowser):
+    BASEURL = 'https://bank%(i)d.example.org'
+
+%(urls)s
+"""
+
+PAGE = """
+
+class Page%(p)d(HTMLPage):
+    @method
+    class iter_accounts(ListElement):
+        item_xpath = '//table[@id="accounts%(p)d"]//tr'
+
+        class item(ItemElement):
+            klass = Account
+
+            obj_id = CleanText('./td[1]')
+            obj_label = CleanText('./td[2]', replace=[('%(p)d', '')])
+            obj_balance = CleanDecimal('./td[3]', replace_dots=True)
+            obj_currency = Regexp(CleanText('./td[4]'), r'^([A-Z]{3})', default=u'EUR')
+"""
+
+LIST = """
+from time import time
+start = time()
+from weboob.capabilities.bank import CapBank
+from weboob.core import Weboob
+weboob = Weboob()
+weboob.load_backends(CapBank)
+print(time() - start)
+"""
+
+CONFIG = """
+from time import time
+start = time()
+from weboob.core import Weboob
+weboob = Weboob()
+for instance_name, name, params in weboob.backends_config.iter_backends():
+    module = weboob.modules_loader.get_or_load_module(name)
+    module.has_caps('CapBank')
+    [module.config[key].masked for key in params if key in module.config]
+print(time() - start)
+"""
+
+
+def make_repository(path, backends, pages, version):
+    for i in range(backends):
+        module = os.path.join(path, 'bank%d' % i)
+        os.makedirs(module)
+        names = ', '.join('Page%d' % p for p in range(pages))
+        values = {'i': i, 'version': version, 'pages': names,
+                  'urls': '\n'.join("    page%d = URL('/page%d', Page%d)" % (p, p, p) for p in range(pages))}
+        with open(os.path.join(module, '__init__.py'), 'w') as f:
+            f.write(INIT % values)
+        with open(os.path.join(module, 'module.py'), 'w') as f:
+            f.write(MODULE % values)
+        with open(os.path.join(module, 'browser.py'), 'w') as f:
+            f.write(BROWSER % values)
+        with open(os.path.join(module, 'pages.py'), 'w') as f:
+            f.write('from weboob.browser.pages import HTMLPage\n'
+                    'from weboob.browser.elements import ItemElement, ListElement, method\n'
+                    'from weboob.browser.filters.standard import CleanText, CleanDecimal, Regexp\n'
+                    'from weboob.capabilities.bank import Account\n')
+            for p in range(pages):
+                f.write(PAGE % {'p': p})
+
+
+def run(code, env):
+    out = subprocess.check_output([sys.executable, '-c', code], env=env)
+    return float(out.decode('ascii').strip().splitlines()[-1])
+
+
+def main():
+    backends = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+
+    from weboob.core import Weboob
+
+    tmpdir = tempfile.mkdtemp(prefix='weboob-startup-')
+    try:
+        repo = os.path.join(tmpdir, 'repository')
+        workdir = os.path.join(tmpdir, 'workdir')
+        os.makedirs(repo)
+        os.makedirs(workdir)
+        make_repository(repo, backends, pages, Weboob.VERSION)
+
+        with open(os.path.join(workdir, 'sources.list'), 'w') as f:
+            f.write('file://%s\n' % repo)
+        with open(os.path.join(workdir, 'backends'), 'w') as f:
+            for i in range(backends):
+                f.write('[bank%d]\n_module = bank%d\nlogin = john\npassword = secret\n\n' % (i, i))
+        os.chmod(os.path.join(workdir, 'backends'), 0o600)
+
+        env = dict(os.environ, WEBOOB_WORKDIR=workdir)
+        subprocess.check_call([sys.executable, '-c', 'from weboob.core import Weboob; Weboob().repositories.update()'],
+                              env=env, stdout=open(os.devnull, 'w'))
+        index = os.path.join(workdir, 'modules', Weboob.VERSION, 'modules.index')
+
+        for name, code in (('boobank list', LIST), ('weboob-config list', CONFIG)):
+            if os.path.exists(index):
+                os.remove(index)
+            cold = run(code, env)
+            warm = min(run(code, env) for _ in range(3))
+            print('%-18s %8.1f ms without index, %8.1f ms with index (%d backends)'
+                  % (name, cold * 1000, warm * 1000, backends))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
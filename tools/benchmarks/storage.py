@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Compare load and save latencies of StandardStorage and SQLiteStorage, with
+two backends which have each stored N IDs.
+
+Usage: storage.py [N...]
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+from time import time
+
+from weboob.tools.storage import StandardStorage, SQLiteStorage, migrate_storage
+
+
+def measure(klass, path, n):
+    start = time()
+    storage = klass(path)
+    storage.load('backends', 'first', {'seen': {}})
+    storage.get('backends', 'first', 'seen', '0')
+    load = time() - start
+
+    start = time()
+    storage.set('backends', 'first', 'seen', 'new', True)
+    storage.save('backends', 'first')
+    save = time() - start
+
+    print('%-16s %7d IDs: load %8.1f ms, save %8.1f ms' % (klass.__name__, n, load * 1000, save * 1000))
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for n in sizes:
+            yaml_path = os.path.join(tmpdir, 'storage-%d.yaml' % n)
+            sqlite_path = os.path.join(tmpdir, 'storage-%d.db' % n)
+
+            storage = StandardStorage(yaml_path)
+            for name in ('first', 'second'):
+                storage.load('backends', name, {})
+                storage.set('backends', name, 'seen', dict((str(i), True) for i in range(n)))
+            storage.save('backends', 'first')
+            migrate_storage(storage, SQLiteStorage(sqlite_path))
+
+            measure(StandardStorage, yaml_path, n)
+            measure(SQLiteStorage, sqlite_path, n)
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Compare FrenchTransaction.match_pattern() with trying PATTERNS one after the
+other, on synthetic labels.
+
+Usage: transactions.py [LABELS] [REPEAT]
+"""
+from __future__ import print_function
+
+import random
+import re
+import sys
+from timeit import repeat
+
+from weboob.tools.capabilities.bank.transactions import FrenchTransaction
+
+
+class Transaction(FrenchTransaction):
+    # from banquepopulaire and creditmutuel
+    PATTERNS = [(re.compile(r'^RET DAB (?P<text>.*?) RETRAIT (DU|LE) (?P<dd>\d{2})(?P<mm>\d{2})(?P<yy>\d+).*'),
+                                                            FrenchTransaction.TYPE_WITHDRAWAL),
+                (re.compile(r'^RET DAB (?P<text>.*?) CARTE ?:.*'),
+                                                            FrenchTransaction.TYPE_WITHDRAWAL),
+                (re.compile(r'^(RETRAIT CARTE )?RET(RAIT)? DAB (?P<text>.*)'),
+                                                            FrenchTransaction.TYPE_WITHDRAWAL),
+                (re.compile(r'^VIR(EMENT)? (?P<text>.*)'),   FrenchTransaction.TYPE_TRANSFER),
+                (re.compile(r'^PRLV SEPA (?P<text>.*)'),     FrenchTransaction.TYPE_ORDER),
+                (re.compile(r'^(PRLV|PRELEVEMENT) (?P<text>.*)'),
+                                                            FrenchTransaction.TYPE_ORDER),
+                (re.compile(r'^CHEQUE( (?P<text>.*))?$'),    FrenchTransaction.TYPE_CHECK),
+                (re.compile(r'^(AGIOS /|FRAIS) (?P<text>.*)', re.IGNORECASE),
+                                                            FrenchTransaction.TYPE_BANK),
+                (re.compile(r'^(CONVENTION \d+ )?COTIS(ATION)? (?P<text>.*)', re.IGNORECASE),
+                                                            FrenchTransaction.TYPE_BANK),
+                (re.compile(r'^REMISE (?P<text>.*)'),        FrenchTransaction.TYPE_DEPOSIT),
+                (re.compile(r'^REM CHQ (?P<text>.*)'),       FrenchTransaction.TYPE_DEPOSIT),
+                (re.compile(r'^ECHEANCE PRET (?P<text>.*)'), FrenchTransaction.TYPE_LOAN_PAYMENT),
+                (re.compile(r'^INTERETS (?P<text>.*)'),      FrenchTransaction.TYPE_BANK),
+                (re.compile(r'^COMMISSION (?P<text>.*)'),    FrenchTransaction.TYPE_BANK),
+                (re.compile(r'^ABONNEMENT (?P<text>.*)'),    FrenchTransaction.TYPE_BANK),
+                (re.compile(r'^CARTE \d+ (?P<dd>\d{2})/(?P<mm>\d{2}) (?P<text>.*)'),
+                                                            FrenchTransaction.TYPE_CARD),
+                (re.compile(r'^PAIEMENT PAR CARTE (?P<text>.*) (?P<dd>\d{2})/(?P<mm>\d{2})'),
+                                                            FrenchTransaction.TYPE_CARD),
+                (re.compile(r'^DEPOT (?P<text>.*)'),         FrenchTransaction.TYPE_DEPOSIT),
+                (re.compile(r'^(?P<text>.*) CARTE \d+ PAIEMENT CB\s+(?P<dd>\d{2})(?P<mm>\d{2}) ?(.*)$'),
+                                                            FrenchTransaction.TYPE_CARD),
+                (re.compile(r'^.* LE (?P<dd>\d{2})/(?P<mm>\d{2})/(?P<yy>\d{2})$'),
+                                                            FrenchTransaction.TYPE_UNKNOWN),
+               ]
+
+
+LABELS = [u'RET DAB PARIS 12 RETRAIT DU 120315',
+          u'RETRAIT DAB LYON',
+          u'VIR SEPA SALAIRE ACME',
+          u'VIREMENT LOYER',
+          u'PRLV SEPA EDF',
+          u'PRELEVEMENT FREE MOBILE',
+          u'CHEQUE 1234567',
+          u'Frais tenue de compte',
+          u'COTISATION CARTE VISA',
+          u'REMISE CHEQUES',
+          u'ECHEANCE PRET 0012345',
+          u'CARTE 4974 12/03 SNCF',
+          u'PAIEMENT PAR CARTE MONOPRIX 12/03',
+          u'SUPERMARCHE CARTE 4974 PAIEMENT CB 1203 PARIS',
+          u'ACHAT DIVERS LE 12/03/15',
+          u'OPERATION INCONNUE',
+         ]
+
+
+def sequential(raw):
+    for pattern, _type in Transaction.PATTERNS:
+        m = pattern.match(raw)
+        if m:
+            return m, _type
+    return None, None
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    loops = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    rand = random.Random(42)
+    labels = [u'%s %d' % (rand.choice(LABELS), i) for i in range(count)]
+
+    results = {}
+    for name, match in (('sequential', sequential), ('matcher', Transaction.match_pattern)):
+        duration = min(repeat(lambda: [match(raw) for raw in labels], number=1, repeat=loops))
+        results[name] = [(m and m.groupdict(), _type) for m, _type in map(match, labels)]
+        print('%-10s %8.2f µs per label (%d labels)' % (name, duration * 1e6 / count, count))
+
+    assert results['sequential'] == results['matcher']
+
+
+if __name__ == '__main__':
+    main()
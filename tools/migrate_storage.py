@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copy a YAML storage file (as written by StandardStorage) into a SQLite
+storage database.
+
+Usage: migrate_storage.py STORAGE_FILE DATABASE
+"""
+from __future__ import print_function
+
+import os
+import sys
+
+from weboob.tools.storage import StandardStorage, SQLiteStorage, migrate_storage
+
+
+def main():
+    if len(sys.argv) != 3:
+        print(__doc__.strip(), file=sys.stderr)
+        return 1
+
+    source, dest = sys.argv[1:]
+    if not os.path.isfile(source):
+        print('%s does not exist' % source, file=sys.stderr)
+        return 1
+
+    storage = SQLiteStorage(dest)
+    migrate_storage(StandardStorage(source), storage)
+    storage.close()
+    print('%s has been copied to %s' % (source, dest))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
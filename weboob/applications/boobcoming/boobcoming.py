@@ -177,15 +177,10 @@ class Boobcoming(ReplApplication):
                            'export': 'ical_formatter'
                            }
 
-    def comp_object(self, obj1, obj2):
-        if isinstance(obj1, BaseCalendarEvent) and isinstance(obj2, BaseCalendarEvent):
-            if obj1.start_date == obj2.start_date:
-                return 0
-            if obj1.start_date > obj2.start_date:
-                return 1
-            return -1
-        else:
-            return super(Boobcoming, self).comp_object(obj1, obj2)
+    def sort_key(self, obj):
+        if isinstance(obj, BaseCalendarEvent):
+            return 0, obj.start_date
+        return (1,) + super(Boobcoming, self).sort_key(obj)
 
 
     def select_values(self, values_from, values_to, query_str):
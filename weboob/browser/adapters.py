@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+from threading import Lock
+from time import time
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse
+
+from requests.adapters import HTTPAdapter
+
+
+__all__ = ['SharedHTTPAdapter', 'get_shared_adapter', 'close_shared_adapters']
+
+
+class SharedHTTPAdapter(HTTPAdapter):
+    """
+    HTTP adapter shared by several sessions.
+
+    Connections pools of a host which has not been used during
+    *idle_timeout* seconds are closed.
+
+    As other sessions may still use it, :func:`close` does nothing. Use
+    :func:`close_shared_adapters` to close all shared adapters.
+
+    :param idle_timeout: delay in seconds, or None to keep connections forever
+    :type idle_timeout: :class:`float`
+    """
+
+    def __init__(self, idle_timeout=None, *args, **kwargs):
+        self.idle_timeout = idle_timeout
+        self.hosts_lock = Lock()
+        # (host, port) -> last time it was used
+        self.last_used = {}
+        # (host, port) -> number of running requests
+        self.running = {}
+        self.last_eviction = time()
+        super(SharedHTTPAdapter, self).__init__(*args, **kwargs)
+
+    def send(self, request, *args, **kwargs):
+        url = urlparse(request.url)
+        host = (url.hostname, url.port or (443 if url.scheme == 'https' else 80))
+
+        with self.hosts_lock:
+            self.running[host] = self.running.get(host, 0) + 1
+        try:
+            return super(SharedHTTPAdapter, self).send(request, *args, **kwargs)
+        finally:
+            with self.hosts_lock:
+                self.running[host] -= 1
+                self.last_used[host] = time()
+            self.evict_idle()
+
+    def evict_idle(self):
+        """
+        Close connections pools of hosts which are idle.
+
+        The lock is held during the whole eviction: as :func:`send` counts a
+        running request before getting its connection, a pool can't be
+        closed while a request is using it.
+        """
+        if self.idle_timeout is None:
+            return
+
+        now = time()
+        with self.hosts_lock:
+            if now - self.last_eviction < self.idle_timeout / 2.0:
+                return
+            self.last_eviction = now
+
+            idle = set(host for host, last_used in self.last_used.items()
+                       if not self.running[host] and now - last_used > self.idle_timeout)
+            if not idle:
+                return
+
+            for host in idle:
+                self.last_used.pop(host)
+                self.running.pop(host)
+
+            managers = [self.poolmanager] + list(self.proxy_manager.values())
+            for manager in managers:
+                for key in list(manager.pools.keys()):
+                    # urllib3 >= 1.22 uses namedtuples, older versions use tuples.
+                    host = (getattr(key, 'key_host', None) or key[1],
+                            getattr(key, 'key_port', None) or key[2])
+                    if host in idle:
+                        # the pool is closed by the container
+                        try:
+                            del manager.pools[key]
+                        except KeyError:
+                            pass
+
+    def close(self):
+        pass
+
+    def close_all(self):
+        with self.hosts_lock:
+            super(SharedHTTPAdapter, self).close()
+
+
+_adapters = {}
+_adapters_lock = Lock()
+
+
+def get_shared_adapter(proxies=None, verify=True, cert=None, max_retries=0,
+                       pool_maxsize=10, idle_timeout=None):
+    """
+    Get an adapter shared by every session which has the same settings.
+
+    Proxies and SSL settings are part of the key, so connections are never
+    shared between sessions which use different ones.
+
+    :param proxies: proxies of the session
+    :type proxies: :class:`dict`
+    :param verify: SSL verification setting of the session
+    :param cert: SSL client certificate of the session
+    :param max_retries: number of retries on connection errors
+    :type max_retries: :class:`int`
+    :param pool_maxsize: maximum of kept-alive connections per host
+    :type pool_maxsize: :class:`int`
+    :param idle_timeout: delay before closing idle connections to a host
+    :type idle_timeout: :class:`float`
+    :rtype: :class:`SharedHTTPAdapter`
+    """
+    key = (tuple(sorted((proxies or {}).items())), verify, cert,
+           max_retries, pool_maxsize, idle_timeout)
+
+    with _adapters_lock:
+        try:
+            return _adapters[key]
+        except KeyError:
+            adapter = SharedHTTPAdapter(idle_timeout,
+                                        pool_connections=100,
+                                        pool_maxsize=pool_maxsize,
+                                        max_retries=max_retries)
+            _adapters[key] = adapter
+            return adapter
+
+
+def close_shared_adapters():
+    """
+    Close connections of every shared adapter.
+    """
+    with _adapters_lock:
+        adapters = list(_adapters.values())
+        _adapters.clear()
+
+    for adapter in adapters:
+        adapter.close_all()
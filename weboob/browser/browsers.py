@@ -44,12 +44,13 @@ from weboob.tools.log import getLogger
 from weboob.tools.ordereddict import OrderedDict
 from weboob.tools.json import json
 
+from .adapters import get_shared_adapter
 from .cookies import WeboobCookieJar
 from .exceptions import HTTPNotFound, ClientError, ServerError
 from .sessions import FuturesSession
 from .profiles import Firefox
 from .pages import NextPage
-from .url import URL
+from .url import URL, URLRouter
 
 
 class Browser(object):
@@ -88,6 +89,23 @@ class Browser(object):
     Maximum of threads for asynchronous requests.
     """
 
+    SHARE_CONNECTIONS = False
+    """
+    Share connections pools with the other browsers of the process which use
+    the same proxies and SSL settings, so they reuse keep-alive connections.
+    """
+
+    MAX_HOST_CONNECTIONS = 10
+    """
+    Maximum of kept-alive connections per host, when connections are shared.
+    """
+
+    CONNECTIONS_IDLE_TIMEOUT = 300
+    """
+    Delay in seconds after which connections to an unused host are closed,
+    when connections are shared.
+    """
+
     @classmethod
     def asset(cls, localfile):
         """
@@ -182,7 +200,14 @@ class Browser(object):
 
         # defines a max_retries. It's mandatory in case a server is not
         # handling keep alive correctly, like the proxy burp
-        a = requests.adapters.HTTPAdapter(max_retries=self.MAX_RETRIES)
+        if self.SHARE_CONNECTIONS:
+            a = get_shared_adapter(proxies=session.proxies,
+                                   verify=session.verify,
+                                   max_retries=self.MAX_RETRIES,
+                                   pool_maxsize=self.MAX_HOST_CONNECTIONS,
+                                   idle_timeout=self.CONNECTIONS_IDLE_TIMEOUT)
+        else:
+            a = requests.adapters.HTTPAdapter(max_retries=self.MAX_RETRIES)
         session.mount('http://', a)
         session.mount('https://', a)
 
@@ -622,8 +647,8 @@ class PagesBrowser(DomainBrowser):
         def internal_callback(response):
             # Try to handle the response page with an URL instance.
             response.page = None
-            for url in self._urls.itervalues():
-                page = url.handle(response)
+            for name, match in URLRouter.get(self).iter_matches(response.url):
+                page = self._urls[name].handle(response, match)
                 if page is not None:
                     self.logger.debug('Handle %s with %s' % (response.url, page.__class__.__name__))
                     response.page = page
@@ -660,6 +685,50 @@ class PagesBrowser(DomainBrowser):
         # Returns self.response in case on_load recalls location()
         return self.response
 
+    def route(self, url):
+        """
+        Find the :class:`URL` object which matches an url, without doing any
+        request.
+
+        :param url: absolute url, or relative to :attr:`BASEURL`
+        :type url: str
+        :returns: the URL object and the parameters of the url, or None
+        :rtype: tuple(:class:`URL`, dict)
+        """
+        for name, match in URLRouter.get(self).iter_matches(self.absurl(url, base=True)):
+            return self._urls[name], match.groupdict()
+
+    def open_many(self, urls, ordered=True, **kwargs):
+        """
+        Download several pages at once, with the threads used by asynchronous
+        requests (at most :attr:`MAX_WORKERS` at the same time), and iterate
+        on their :class:`Page` objects.
+
+        Requests are processed like with :meth:`open`, and it doesn't change
+        the current page. If a request fails, its exception is raised when
+        its page should be yielded, and pending requests are cancelled.
+
+        >>> pages = list(browser.open_many(urls)) # doctest: +SKIP
+
+        :param urls: URLs or :class:`requests.Request` objects
+        :type urls: iterable
+        :param ordered: if True, pages are yielded in the order of *urls*,
+                        otherwise as soon as they are downloaded
+        :type ordered: bool
+        :returns: pages, or None for responses which are not handled by any
+                  :class:`URL`
+        :rtype: iter[:class:`Page`]
+        """
+        from concurrent.futures import as_completed
+
+        futures = [self.async_open(url, **kwargs) for url in urls]
+        try:
+            for future in (futures if ordered else as_completed(futures)):
+                yield future.result().page
+        finally:
+            for future in futures:
+                future.cancel()
+
     def pagination(self, func, *args, **kwargs):
         r"""
         This helper function can be used to handle pagination pages easily.
@@ -19,17 +19,20 @@
 
 import re
 import sys
+from collections import MutableMapping
 from copy import deepcopy
 
+from weboob.capabilities.base import _IMMUTABLE_TYPES
 from weboob.tools.log import getLogger, DEBUG_FILTERS
 from weboob.tools.ordereddict import OrderedDict
-from weboob.browser.pages import NextPage
+from weboob.browser.pages import NextPage, StreamingPage
 
 from .filters.standard import _Filter, CleanText
 from .filters.html import AttributeNotFound, XPathNotFound
+from .xpath import xpath
 
 
-__all__ = ['DataError', 'AbstractElement', 'ListElement', 'ItemElement', 'TableElement', 'SkipItem']
+__all__ = ['DataError', 'ElementEnv', 'AbstractElement', 'ListElement', 'ItemElement', 'TableElement', 'SkipItem']
 
 
 class DataError(Exception):
@@ -48,7 +51,142 @@ def method(klass):
     return inner
 
 
+def _copy_value(value):
+    if isinstance(value, _IMMUTABLE_TYPES):
+        return value
+    return deepcopy(value)
+
+
+class ElementEnv(MutableMapping):
+    """
+    Environment of an element, layered over the one of its parent.
+
+    Values are set in the element's own layer, and a mutable value of the
+    parent is copied the first time it is read, so an element never changes
+    the environment of its parent, and nothing is copied up front.
+
+    >>> parent = ElementEnv({'a': 1, 'l': []})
+    >>> child = ElementEnv(parent)
+    >>> child['a'] = 2
+    >>> child['l'].append(42)
+    >>> del child['a']
+    >>> sorted(child.items()), sorted(parent.items())
+    ([('l', [42])], [('a', 1), ('l', [])])
+
+    :param parent: environment of the parent, or page parameters
+    :type parent: :class:`ElementEnv` or :class:`dict`
+    """
+
+    _deleted = object()
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.values = {}
+
+    def _lookup(self, key):
+        env = self
+        while isinstance(env, ElementEnv):
+            if key in env.values:
+                value = env.values[key]
+                if value is self._deleted:
+                    raise KeyError(key)
+                return value
+            env = env.parent
+        if env is None:
+            raise KeyError(key)
+        return env[key]
+
+    def __getitem__(self, key):
+        try:
+            value = self.values[key]
+        except KeyError:
+            value = self._copy_from_parent(key)
+
+        if value is self._deleted:
+            raise KeyError(key)
+        return value
+
+    def _copy_from_parent(self, key):
+        if self.parent is None:
+            raise KeyError(key)
+
+        if isinstance(self.parent, ElementEnv):
+            value = self.parent._lookup(key)
+        else:
+            value = self.parent[key]
+
+        if isinstance(value, _IMMUTABLE_TYPES):
+            return value
+
+        # keep the copy, as changes on it have to be seen on next lookups
+        value = self.values[key] = deepcopy(value)
+        return value
+
+    def __setitem__(self, key, value):
+        self.values[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.values[key] = self._deleted
+
+    def __contains__(self, key):
+        try:
+            self._lookup(key)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        seen = set()
+        env = self
+        while isinstance(env, ElementEnv):
+            for key, value in env.values.items():
+                if key not in seen:
+                    seen.add(key)
+                    if value is not self._deleted:
+                        yield key
+            env = env.parent
+        if env is not None:
+            for key in env:
+                if key not in seen:
+                    yield key
+
+    def __len__(self):
+        return sum(1 for key in self)
+
+    def __repr__(self):
+        return '<%s %r>' % (self.__class__.__name__, dict(self.items()))
+
+
+class _ElementMeta(type):
+    """
+    Private meta-class used to introspect :class:`AbstractElement` classes once,
+    instead of every time an element is instantiated.
+    """
+    def __new__(mcs, name, bases, attrs):
+        new_class = super(_ElementMeta, mcs).__new__(mcs, name, bases, attrs)
+
+        new_class._loader_attrs = []
+        new_class._item_classes = []
+        new_class._columns = {}
+        for attrname in dir(new_class):
+            attr = getattr(new_class, attrname)
+            if attrname.startswith('load_'):
+                new_class._loader_attrs.append((attrname[5:], attrname))
+            elif attrname.startswith('col_'):
+                if not isinstance(attr, (list, tuple)):
+                    attr = [attr]
+                new_class._columns[attrname[4:]] = [s.lower() for s in attr]
+            elif isinstance(attr, _ElementMeta) and attr is not new_class:
+                new_class._item_classes.append(attr)
+
+        return new_class
+
+
 class AbstractElement(object):
+    __metaclass__ = _ElementMeta
+
     _creation_counter = 0
 
     def __init__(self, page, parent=None, el=None):
@@ -62,9 +200,9 @@ class AbstractElement(object):
             self.el = page.doc
 
         if parent is not None:
-            self.env = deepcopy(parent.env)
+            self.env = ElementEnv(parent.env)
         else:
-            self.env = deepcopy(page.params)
+            self.env = ElementEnv(page.params)
 
         # Used by debug
         self._random_id = AbstractElement._creation_counter
@@ -82,7 +220,7 @@ class AbstractElement(object):
         elif callable(func):
             value = func()
         else:
-            value = deepcopy(func)
+            value = _copy_value(func)
 
         return value
 
@@ -93,14 +231,10 @@ class AbstractElement(object):
         return self.el.cssselect(*args, **kwargs)
 
     def xpath(self, *args, **kwargs):
-        return self.el.xpath(*args, **kwargs)
+        return xpath(self.el, *args, **kwargs)
 
     def handle_loaders(self):
-        for attrname in dir(self):
-            m = re.match('load_(.*)', attrname)
-            if not m:
-                continue
-            name = m.group(1)
+        for name, attrname in self._loader_attrs:
             if name in self.loaders:
                 continue
             loader = getattr(self, attrname)
@@ -109,6 +243,7 @@ class AbstractElement(object):
 
 class ListElement(AbstractElement):
     item_xpath = None
+    item_tag = None
     flush_at_end = False
     ignore_duplicate = False
 
@@ -129,8 +264,11 @@ class ListElement(AbstractElement):
         This method can be overridden if xpath filters are not
         sufficient.
         """
-        if self.item_xpath is not None:
-            for el in self.el.xpath(self.item_xpath):
+        if isinstance(self.page, StreamingPage):
+            for el in self.page.iter_elements(self.item_tag):
+                yield el
+        elif self.item_xpath is not None:
+            for el in xpath(self.el, self.item_xpath):
                 yield el
         else:
             yield self.el
@@ -138,19 +276,20 @@ class ListElement(AbstractElement):
     def __iter__(self):
         self.parse(self.el)
 
-        items = []
-        for el in self.find_elements():
-            for attrname in dir(self):
-                attr = getattr(self, attrname)
-                if isinstance(attr, type) and issubclass(attr, AbstractElement) and attr != type(self):
-                    item = attr(self.page, self, el)
-                    item.handle_loaders()
-                    items.append(item)
-
-        for item in items:
-            for obj in item:
-                obj = self.store(obj)
-                if obj and not self.flush_at_end:
+        if isinstance(self.page, StreamingPage):
+            # Elements of a streaming page are cleared once the next one is
+            # parsed, so each one is handled as soon as it is found.
+            for el in self.find_elements():
+                for item in self.build_items(el):
+                    for obj in self.handle_item(item):
+                        yield obj
+        else:
+            items = []
+            for el in self.find_elements():
+                items += self.build_items(el)
+
+            for item in items:
+                for obj in self.handle_item(item):
                     yield obj
 
         if self.flush_at_end:
@@ -159,6 +298,20 @@ class ListElement(AbstractElement):
 
         self.check_next_page()
 
+    def build_items(self, el):
+        items = []
+        for klass in self._item_classes:
+            item = klass(self.page, self, el)
+            item.handle_loaders()
+            items.append(item)
+        return items
+
+    def handle_item(self, item):
+        for obj in item:
+            obj = self.store(obj)
+            if obj and not self.flush_at_end:
+                yield obj
+
     def flush(self):
         for obj in self.objects.itervalues():
             yield obj
@@ -197,7 +350,7 @@ class SkipItem(Exception):
     """
 
 
-class _ItemElementMeta(type):
+class _ItemElementMeta(_ElementMeta):
     """
     Private meta-class used to keep order of obj_* attributes in :class:`ItemElement`.
     """
@@ -285,19 +438,10 @@ class TableElement(ListElement):
 
         self._cols = {}
 
-        columns = {}
-        for attrname in dir(self):
-            m = re.match('col_(.*)', attrname)
-            if m:
-                cols = getattr(self, attrname)
-                if not isinstance(cols, (list,tuple)):
-                    cols = [cols]
-                columns[m.group(1)] = [s.lower() for s in cols]
-
         colnum = 0
-        for el in self.el.xpath(self.head_xpath):
+        for el in xpath(self.el, self.head_xpath):
             title = self.cleaner.clean(el).lower()
-            for name, titles in columns.iteritems():
+            for name, titles in self._columns.iteritems():
                 if title in titles and not name in self._cols:
                     self._cols[name] = colnum
             try:
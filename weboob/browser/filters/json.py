@@ -30,14 +30,28 @@ class _DictMeta(type):
 
 
 class Dict(_Selector):
+    """
+    Select a value in a JSON document, or in a row of a CSV page, from a
+    path of keys separated by slashes. Other keys, like list indexes, can be
+    given with brackets.
+
+    >>> doc = {'items': [{'id': 1}, {'id': 2}]}
+    >>> Dict('items')[1]['id'](doc)
+    2
+    >>> Dict('items', default=None)[5]['id'](doc) is None
+    True
+    >>> Dict('items/id', default=u'')(doc)
+    u''
+    """
+
     __metaclass__ = _DictMeta
 
     def __init__(self, selector=None, default=_NO_DEFAULT):
         super(Dict, self).__init__(self, default=default)
-        self.selector = selector.split('/') if selector is not None else []
+        self.selector = tuple(selector.split('/')) if selector is not None else ()
 
     def __getitem__(self, name):
-        self.selector.append(name)
+        self.selector += (name,)
         return self
 
     @classmethod
@@ -48,9 +62,10 @@ class Dict(_Selector):
             content = item.el
 
         for el in selector:
-            if el not in content:
+            try:
+                content = content[el]
+            except (KeyError, IndexError, TypeError):
+                # the key does not exist, or content is not a dict or a list
                 return None
 
-            content = content.get(el)
-
         return content
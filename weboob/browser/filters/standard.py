@@ -32,6 +32,7 @@ from weboob.capabilities.base import empty
 from weboob.tools.compat import basestring
 from weboob.exceptions import ParseError
 from weboob.browser.url import URL
+from weboob.browser.xpath import xpath
 from weboob.tools.log import getLogger, DEBUG_FILTERS
 
 
@@ -161,7 +162,7 @@ class Filter(_Filter):
     @classmethod
     def select(cls, selector, item, obj=None, key=None):
         if isinstance(selector, basestring):
-            return item.xpath(selector)
+            return xpath(item, selector)
         elif isinstance(selector, _Filter):
             selector._key = key
             selector._obj = obj
@@ -187,7 +188,7 @@ class _Selector(Filter):
         if elements is not None:
             return elements
         else:
-            return self.default_or_raise(ParseError('Element %r not found' % self.selector))
+            return self.default_or_raise(ParseError('Element %r not found' % (self.selector,)))
 
 
 class AsyncLoad(Filter):
@@ -277,7 +278,7 @@ class TableCell(_Filter):
         for name in self.names:
             idx = item.parent.get_colnum(name)
             if idx is not None:
-                return item.xpath('./td[%s]' % (idx + 1))
+                return xpath(item, './td[%s]' % (idx + 1))
 
         return self.default_or_raise(ColumnNotFound('Unable to find column %s' % ' or '.join(self.names)))
 
@@ -32,6 +32,57 @@ from weboob.tools.compat import basestring
 from weboob.tools.log import getLogger
 
 
+def lower_case(context, args):
+    """
+    This lxml extension returns the given strings in lowercase.
+    """
+    return ' '.join([s.lower() for s in args])
+
+
+def has_class(context, *classes):
+    """
+    This lxml extension allows to select by CSS class more easily
+
+    >>> import lxml.html as html
+    >>> ns = html.etree.FunctionNamespace(None)
+    >>> ns['has-class'] = has_class
+    >>> root = html.etree.fromstring('''
+    ... <a>
+    ...     <b class="one first text">I</b>
+    ...     <b class="two text">LOVE</b>
+    ...     <b class="three text">CSS</b>
+    ... </a>
+    ... ''')
+
+    >>> len(root.xpath('//b[has-class("text")]'))
+    3
+    >>> len(root.xpath('//b[has-class("one")]'))
+    1
+    >>> len(root.xpath('//b[has-class("text", "first")]'))
+    1
+    >>> len(root.xpath('//b[not(has-class("first"))]'))
+    2
+    >>> len(root.xpath('//b[has-class("not-exists")]'))
+    0
+    """
+    try:
+        value = context.context_node.get('class')
+    except AttributeError:
+        # not an element
+        return False
+
+    if not value:
+        return False
+
+    # the same as a sub-expression with normalize-space(@class), but without
+    # compiling and evaluating it on every tested node.
+    node_classes = value.split()
+    for c in classes:
+        if c not in node_classes:
+            return False
+    return True
+
+
 def pagination(func):
     r"""
     This helper decorator can be used to handle pagination pages easily.
@@ -457,9 +508,14 @@ class HTMLPage(Page):
     """
 
     def __init__(self, *args, **kwargs):
-        import lxml.html as html
-        ns = html.etree.FunctionNamespace(None)
-        self.define_xpath_functions(ns)
+        cls = self.__class__
+        # Functions are registered in the global namespace of lxml, so it is
+        # only done for the first page of each class.
+        if not cls.__dict__.get('_xpath_functions_defined', False):
+            import lxml.html as html
+            ns = html.etree.FunctionNamespace(None)
+            self.define_xpath_functions(ns)
+            cls._xpath_functions_defined = True
 
         super(HTMLPage, self).__init__(*args, **kwargs)
 
@@ -467,39 +523,11 @@ class HTMLPage(Page):
         """
         Define XPath functions on the given lxml function namespace.
 
-        This method is called in constructor of :class:`HTMLPage` and can be
-        overloaded by children classes to add extra functions.
-        """
-        ns['lower-case'] = lambda context, args: ' '.join([s.lower() for s in args])
-
-        def has_class(context, *classes):
-            """
-            This lxml extension allows to select by CSS class more easily
-
-            >>> ns = html.etree.FunctionNamespace(None)
-            >>> ns['has-class'] = has_class
-            >>> root = html.etree.fromstring('''
-            ... <a>
-            ...     <b class="one first text">I</b>
-            ...     <b class="two text">LOVE</b>
-            ...     <b class="three text">CSS</b>
-            ... </a>
-            ... ''')
-
-            >>> len(root.xpath('//b[has-class("text")]'))
-            3
-            >>> len(root.xpath('//b[has-class("one")]'))
-            1
-            >>> len(root.xpath('//b[has-class("text", "first")]'))
-            1
-            >>> len(root.xpath('//b[not(has-class("first"))]'))
-            2
-            >>> len(root.xpath('//b[has-class("not-exists")]'))
-            0
-            """
-            expressions = ' and '.join(["contains(concat(' ', normalize-space(@class), ' '), ' {0} ')".format(c) for c in classes])
-            xpath = 'self::*[@class and {0}]'.format(expressions)
-            return bool(context.context_node.xpath(xpath))
+        This method is called when the first page of each :class:`HTMLPage`
+        class is instantiated, and can be overloaded by children classes to add
+        extra functions.
+        """
+        ns['lower-case'] = lower_case
         ns['has-class'] = has_class
 
     def build_doc(self, content):
@@ -571,6 +599,290 @@ class HTMLPage(Page):
         raise FormNotFound()
 
 
+class _ResponseStream(object):
+    """
+    File-like object to read the content of a response while it is
+    downloaded.
+    """
+
+    def __init__(self, response, chunk_size):
+        self.chunks = response.iter_content(chunk_size)
+
+    def read(self, size=-1):
+        if size == 0:
+            # ijson reads nothing first, to know the type of data
+            return b''
+        # lxml and ijson accept chunks of any size, and an empty one at the end
+        return next(self.chunks, b'')
+
+
+class StreamingPage(Page):
+    """
+    Page whose document is parsed incrementally, to process huge documents
+    without keeping a whole tree in memory.
+
+    :attr:`doc` is None: elements are yielded by :meth:`iter_elements` as
+    soon as they are parsed, and cleared afterwards. To parse the response
+    while it is downloaded, instead of after, open the page with
+    ``stream=True``.
+
+    It is used by a :class:`weboob.browser.elements.ListElement` which has
+    an ``item_tag`` attribute::
+
+        class FeedPage(StreamingXMLPage):
+            @method
+            class iter_entries(ListElement):
+                item_tag = 'item'
+
+                class item(ItemElement):
+                    klass = Message
+                    obj_title = CleanText('./title')
+
+    As everything which is before the current item is cleared, selectors of
+    items have to be relative to the item node.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    """
+    Size of chunks read from the response.
+    """
+
+    HTML = False
+    """
+    If True, the content is parsed as HTML.
+    """
+
+    @property
+    def data(self):
+        # The response is read by iter_elements().
+        return None
+
+    def build_doc(self, content):
+        return None
+
+    def iter_elements(self, tag=None):
+        """
+        Parse the response and yield elements once their end tag is reached.
+
+        Elements are cleared, and removed from their parent, when the next
+        one is requested. With a streamed response, this can only be called
+        once.
+
+        :param tag: only yield elements with this tag (or list of tags)
+        :type tag: :class:`str`
+        """
+        import lxml.etree as etree
+
+        # Without a forced encoding, lxml reads the XML declaration or the
+        # HTML meta charset, as detect_encoding() does for XMLPage and
+        # HTMLPage. The HTTP charset is often missing (so requests gives
+        # ISO-8859-1 for text/* content) and would take precedence.
+        encoding = self.encoding if self.forced_encoding else None
+        source = _ResponseStream(self.response, self.CHUNK_SIZE)
+        try:
+            for _, el in etree.iterparse(source, events=('end',), tag=tag,
+                                         encoding=encoding, html=self.HTML):
+                yield el
+
+                el.clear()
+                parent = el.getparent()
+                if parent is not None:
+                    while el.getprevious() is not None:
+                        del parent[0]
+        finally:
+            self.response.close()
+
+
+def _iter_lines(chunks, newlines_hack=False):
+    """
+    Split chunks of bytes in lines, which keep their line terminator.
+
+    With *newlines_hack*, '\\r\\n' and '\\r' are also line terminators, and
+    are replaced by '\\n'.
+    """
+    pending = b''
+    for chunk in chunks:
+        pending += chunk
+        if newlines_hack:
+            lines = pending.splitlines(True)
+        else:
+            lines = pending.split(b'\n')
+            lines = [line + b'\n' for line in lines[:-1]] + lines[-1:]
+        # The last line may be incomplete, or end with a '\r' which is
+        # followed by a '\n' in the next chunk.
+        pending = lines.pop() if lines else b''
+        for line in lines:
+            if newlines_hack:
+                line = line.rstrip(b'\r\n') + b'\n'
+            yield line
+
+    if pending:
+        if newlines_hack:
+            pending = pending.rstrip(b'\r\n') + b'\n'
+        yield pending
+
+
+class CsvRow(object):
+    """
+    Row of a CSV file with a header.
+
+    Cells are read by column name like in a dict, and the header is shared
+    by all rows of the file.
+
+    >>> header = {'date': 0, 'label': 1}
+    >>> row = CsvRow(header, ['2015-05-20', 'Coffee'])
+    >>> row['label'], row.get('amount'), 'date' in row
+    ('Coffee', None, True)
+
+    :param header: column name -> index
+    :type header: :class:`dict`
+    :param cells: values of the row
+    :type cells: :class:`list`
+    """
+
+    __slots__ = ('header', 'cells')
+
+    def __init__(self, header, cells):
+        self.header = header
+        self.cells = cells
+
+    def __getitem__(self, key):
+        try:
+            return self.cells[self.header[key]]
+        except IndexError:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return self.header.get(key, len(self.cells)) < len(self.cells)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def keys(self):
+        return [key for key in self.header if key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def __repr__(self):
+        return '<%s %r>' % (self.__class__.__name__, dict(self.items()))
+
+
+class StreamingCsvPage(StreamingPage, CsvPage):
+    """
+    CSV page whose rows are read and decoded lazily. See
+    :class:`StreamingPage`.
+
+    :meth:`iter_elements` yields rows as lists of cells, or as
+    :class:`CsvRow` objects if :attr:`HEADER` is set, so a
+    :class:`weboob.browser.elements.ListElement` builds its items from
+    rows, on which :class:`weboob.browser.filters.json.Dict` selects cells.
+    """
+
+    def iter_elements(self, tag=None):
+        """
+        Parse the response and yield rows.
+
+        With a streamed response, this can only be called once.
+
+        :param tag: ignored
+        """
+        import csv
+
+        # csv does not support Unicode, so UTF-16 is converted to UTF-8.
+        encoding = self.encoding
+        chunks = self.response.iter_content(self.CHUNK_SIZE)
+        if encoding == 'utf-16le':
+            chunks = (chunk.encode('utf-8') for chunk in codecs.iterdecode(chunks, 'utf-16'))
+            encoding = 'utf-8'
+
+        reader = csv.reader(_iter_lines(chunks, self.NEWLINES_HACK), dialect=self.DIALECT, **self.FMTPARAMS)
+        header = None
+        try:
+            for i, row in enumerate(reader):
+                if self.HEADER and i+1 < self.HEADER:
+                    continue
+                row = self.decode_row(row, encoding)
+                if header is None and self.HEADER:
+                    header = dict((name, j) for j, name in enumerate(row))
+                elif header is not None:
+                    yield CsvRow(header, row)
+                else:
+                    yield row
+        finally:
+            self.response.close()
+
+
+class StreamingJsonPage(StreamingPage):
+    """
+    JSON page whose arrays are parsed incrementally. See
+    :class:`StreamingPage`.
+
+    Parsing is done with `ijson <https://pypi.python.org/pypi/ijson>`_ if it
+    is installed; note that it returns non-integer numbers as
+    :class:`decimal.Decimal`. Otherwise, the whole document is loaded as
+    with :class:`JsonPage`.
+
+    A :class:`weboob.browser.elements.ListElement` gives the path of the
+    array in its ``item_tag`` attribute, with the syntax of
+    :class:`weboob.browser.filters.json.Dict` (for example
+    ``'data/items'``, or ``''`` if the document is the array).
+    """
+
+    def iter_elements(self, tag=None):
+        """
+        Parse the response and yield the items of an array.
+
+        With a streamed response, this can only be called once.
+
+        :param tag: path of the array
+        :type tag: :class:`str`
+        """
+        path = [key for key in (tag or '').split('/') if key]
+        try:
+            try:
+                import ijson
+            except ImportError:
+                from weboob.tools.json import json
+                content = json.loads(self.response.text)
+                for key in path:
+                    if not isinstance(content, dict) or key not in content:
+                        return
+                    content = content[key]
+                if isinstance(content, list):
+                    for el in content:
+                        yield el
+            else:
+                prefix = '.'.join(path + ['item'])
+                for el in ijson.items(_ResponseStream(self.response, self.CHUNK_SIZE), prefix):
+                    yield el
+        finally:
+            self.response.close()
+
+
+class StreamingXMLPage(StreamingPage):
+    """
+    XML page parsed incrementally. See :class:`StreamingPage`.
+    """
+
+
+class StreamingHTMLPage(StreamingPage):
+    """
+    HTML page parsed incrementally. See :class:`StreamingPage`.
+    """
+
+    HTML = True
+
+
 class LoggedPage(object):
     """
     A page that only logged users can reach. If we did not get a redirection
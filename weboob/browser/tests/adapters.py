@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from threading import Event, Thread
+from time import time
+from unittest import TestCase
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+import requests
+
+from weboob.browser import Browser
+from weboob.browser.adapters import SharedHTTPAdapter, get_shared_adapter, close_shared_adapters
+
+
+class SharingBrowser(Browser):
+    SHARE_CONNECTIONS = True
+
+
+class OtherSharingBrowser(Browser):
+    SHARE_CONNECTIONS = True
+
+
+class SharedAdapterTest(TestCase):
+    def tearDown(self):
+        close_shared_adapters()
+
+    def test_shared_between_browsers(self):
+        adapter = SharingBrowser().session.get_adapter('http://weboob.org')
+        self.assertIsInstance(adapter, SharedHTTPAdapter)
+        self.assertIs(OtherSharingBrowser().session.get_adapter('https://weboob.org'), adapter)
+
+    def test_not_shared_with_other_settings(self):
+        adapter = SharingBrowser().session.get_adapter('http://weboob.org')
+        proxied = SharingBrowser(proxy={'http': 'http://proxy:3128'}).session.get_adapter('http://weboob.org')
+        self.assertIsNot(proxied, adapter)
+        self.assertIsNot(Browser().session.get_adapter('http://weboob.org'), adapter)
+        self.assertIsNot(get_shared_adapter(idle_timeout=30), adapter)
+
+    def test_close_shared_adapters(self):
+        adapter = get_shared_adapter()
+        adapter.poolmanager.connection_from_host('weboob.org', 80, 'http')
+
+        close_shared_adapters()
+        self.assertEqual(len(adapter.poolmanager.pools), 0)
+        self.assertIsNot(get_shared_adapter(), adapter)
+
+    def test_close_does_nothing(self):
+        adapter = get_shared_adapter()
+        adapter.poolmanager.connection_from_host('weboob.org', 80, 'http')
+
+        adapter.close()
+        self.assertEqual(len(adapter.poolmanager.pools), 1)
+        self.assertIs(get_shared_adapter(), adapter)
+
+
+class EvictionTest(TestCase):
+    def setUp(self):
+        self.adapter = SharedHTTPAdapter(10)
+        self.adapter.last_eviction = 0
+
+    def tearDown(self):
+        self.adapter.close_all()
+
+    def add_host(self, host, idle, running=0):
+        self.adapter.poolmanager.connection_from_host(host, 80, 'http')
+        self.adapter.last_used[(host, 80)] = time() - idle
+        self.adapter.running[(host, 80)] = running
+
+    def pools(self):
+        return sorted(key.key_host for key in self.adapter.poolmanager.pools.keys())
+
+    def test_evict_idle_hosts(self):
+        self.add_host('idle.org', 20)
+        self.add_host('recent.org', 1)
+        self.add_host('running.org', 20, running=1)
+
+        self.adapter.evict_idle()
+        self.assertEqual(self.pools(), ['recent.org', 'running.org'])
+        self.assertNotIn(('idle.org', 80), self.adapter.last_used)
+
+    def test_evictions_are_spaced(self):
+        self.add_host('idle.org', 20)
+        self.adapter.last_eviction = time()
+
+        self.adapter.evict_idle()
+        self.assertEqual(self.pools(), ['idle.org'])
+
+    def test_no_timeout(self):
+        self.adapter.idle_timeout = None
+        self.add_host('idle.org', 20)
+
+        self.adapter.evict_idle()
+        self.assertEqual(self.pools(), ['idle.org'])
+
+    def test_running_request_is_not_evicted(self):
+        received = Event()
+        release = Event()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                received.set()
+                release.wait(5)
+                self.send_response(200)
+                self.send_header('Content-Length', '2')
+                self.end_headers()
+                self.wfile.write(b'ok')
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(('127.0.0.1', 0), Handler)
+        Thread(target=server.handle_request).start()
+        url = 'http://127.0.0.1:%d/' % server.server_port
+        session = requests.Session()
+        session.mount('http://', self.adapter)
+        responses = []
+        thread = Thread(target=lambda: responses.append(session.get(url)))
+        thread.start()
+        try:
+            self.assertTrue(received.wait(5))
+            host = ('127.0.0.1', server.server_port)
+            self.adapter.last_used[host] = time() - 20
+            self.adapter.evict_idle()
+            self.assertEqual(len(self.adapter.poolmanager.pools), 1)
+        finally:
+            release.set()
+            thread.join()
+            server.server_close()
+
+        self.assertEqual(responses[0].content, b'ok')
+        self.assertEqual(self.adapter.running[host], 0)
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+import re
+from threading import Thread
+from time import sleep
+from unittest import TestCase
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from weboob.browser import PagesBrowser, URL
+from weboob.browser.exceptions import ServerError
+from weboob.browser.pages import HTMLPage
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    /page/<id>/<delay>: a page sent after delay milliseconds;
+    /error: an internal server error;
+    any other path: a page which is not handled by the browser.
+    """
+
+    def do_GET(self):
+        self.server.requested.append(self.path)
+        m = re.match(r'^/page/(\d+)/(\d+)$', self.path)
+        if m:
+            sleep(int(m.group(2)) / 1000.)
+        status = 500 if self.path == '/error' else 200
+        body = ('<html><body><p id="id">%s</p></body></html>' % (m.group(1) if m else '')).encode('ascii')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Page(HTMLPage):
+    @property
+    def id(self):
+        return self.doc.xpath('//p[@id="id"]')[0].text
+
+
+class ManyBrowser(PagesBrowser):
+    page = URL(r'/page/(?P<id>\d+)/(?P<delay>\d+)', Page)
+
+    def __init__(self, *args, **kwargs):
+        super(ManyBrowser, self).__init__(*args, **kwargs)
+        self.futures = []
+
+    def async_open(self, *args, **kwargs):
+        future = super(ManyBrowser, self).async_open(*args, **kwargs)
+        self.futures.append(future)
+        return future
+
+
+class OneWorkerBrowser(ManyBrowser):
+    MAX_WORKERS = 1
+
+
+class OpenManyTest(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.requested = []
+        self.thread = Thread(target=self.server.serve_forever, args=(0.05,))
+        self.thread.start()
+        ManyBrowser.BASEURL = 'http://127.0.0.1:%d' % self.server.server_port
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def test_ordered(self):
+        browser = ManyBrowser()
+        pages = list(browser.open_many(['/page/1/300', '/page/2/0', '/page/3/100', '/other']))
+        self.assertEqual([page.id for page in pages[:3]], ['1', '2', '3'])
+        # the response is not handled by any URL
+        self.assertIsNone(pages[3])
+        # the current page doesn't change
+        self.assertIsNone(browser.page)
+
+    def test_unordered(self):
+        browser = ManyBrowser()
+        pages = browser.open_many(['/page/1/300', '/page/2/0', '/page/3/150'], ordered=False)
+        self.assertEqual([page.id for page in pages], ['2', '3', '1'])
+
+    def test_error(self):
+        browser = ManyBrowser()
+        pages = browser.open_many(['/page/1/0', '/error', '/page/2/0'])
+        self.assertEqual(next(pages).id, '1')
+        # the error is raised in place of the page
+        self.assertRaises(ServerError, next, pages)
+
+    def test_close(self):
+        browser = OneWorkerBrowser()
+        pages = browser.open_many(['/page/%d/100' % i for i in range(5)])
+        self.assertEqual(next(pages).id, '0')
+        pages.close()
+
+        self.assertEqual(len(browser.futures), 5)
+        # requests which are not started yet are cancelled
+        self.assertTrue(all(future.cancelled() for future in browser.futures[2:]))
+        for future in browser.futures[:2]:
+            if not future.cancelled():
+                future.result()
+        self.assertLessEqual(len(self.server.requested), 2)
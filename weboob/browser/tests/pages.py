@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+import codecs
+import sys
+from decimal import Decimal
+from io import BytesIO
+from unittest import TestCase, skipIf
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from weboob.browser import Browser
+from weboob.browser.elements import ItemElement, ListElement, method
+from weboob.browser.filters.json import Dict
+from weboob.browser.filters.standard import CleanDecimal
+from weboob.browser.pages import CsvPage, CsvRow, StreamingCsvPage, StreamingJsonPage, StreamingXMLPage, StreamingHTMLPage
+from weboob.capabilities.base import BaseObject, DecimalField, StringField
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+def make_response(body, content_type):
+    response = Response()
+    response.status_code = 200
+    response.url = 'http://weboob.org/'
+    response.raw = BytesIO(body)
+    response.headers = CaseInsensitiveDict({'Content-Type': content_type})
+    response.encoding = get_encoding_from_headers(response.headers)
+    return response
+
+
+class Latin1XMLPage(StreamingXMLPage):
+    ENCODING = 'iso-8859-1'
+
+
+class StreamingPageTest(TestCase):
+    def setUp(self):
+        self.browser = Browser()
+
+    def texts(self, klass, body, content_type, tag, **kwargs):
+        page = klass(self.browser, make_response(body, content_type), **kwargs)
+        return [el.text for el in page.iter_elements(tag)]
+
+    def test_xml_declaration(self):
+        body = u'<?xml version="1.0" encoding="utf-8"?><a><b>Élève</b></a>'.encode('utf-8')
+        self.assertEqual(self.texts(StreamingXMLPage, body, 'text/xml', 'b'), [u'Élève'])
+
+        body = u'<?xml version="1.0" encoding="iso-8859-1"?><a><b>Élève</b></a>'.encode('iso-8859-1')
+        self.assertEqual(self.texts(StreamingXMLPage, body, 'text/xml', 'b'), [u'Élève'])
+
+    def test_xml_without_declaration(self):
+        body = u'<a><b>Élève</b></a>'.encode('utf-8')
+        self.assertEqual(self.texts(StreamingXMLPage, body, 'text/xml', 'b'), [u'Élève'])
+
+    def test_html_meta_charset(self):
+        body = u'<html><head><meta charset="utf-8"></head><body><p>Élève</p></body></html>'.encode('utf-8')
+        self.assertEqual(self.texts(StreamingHTMLPage, body, 'text/html', 'p'), [u'Élève'])
+
+    def test_forced_encoding(self):
+        body = u'<a><b>Élève</b></a>'.encode('iso-8859-1')
+        self.assertEqual(self.texts(Latin1XMLPage, body, 'text/xml', 'b'), [u'Élève'])
+        self.assertEqual(self.texts(StreamingXMLPage, body, 'text/xml', 'b', encoding='iso-8859-1'), [u'Élève'])
+
+    def test_elements_are_cleared(self):
+        body = b'<a><b>1</b><b>2</b><b>3</b></a>'
+        page = StreamingXMLPage(self.browser, make_response(body, 'text/xml'))
+        texts = []
+        previous = None
+        for el in page.iter_elements('b'):
+            texts.append(el.text)
+            # only the previous element, cleared, is kept
+            self.assertLessEqual(el.getparent().index(el), 1)
+            if previous is not None:
+                self.assertIsNone(previous.text)
+            previous = el
+        self.assertEqual(texts, ['1', '2', '3'])
+
+
+class HeaderCsvPage(StreamingCsvPage):
+    HEADER = 2
+
+
+class Utf16CsvPage(StreamingCsvPage):
+    ENCODING = 'utf-16le'
+    DIALECT = 'excel-tab'
+    HEADER = 1
+
+
+class Operation(BaseObject):
+    label = StringField('Label')
+    amount = DecimalField('Amount')
+
+
+class OperationsPage(StreamingCsvPage):
+    HEADER = 1
+    FMTPARAMS = {'delimiter': ';'}
+
+    @method
+    class iter_operations(ListElement):
+        class item(ItemElement):
+            klass = Operation
+
+            obj_id = Dict('id')
+            obj_label = Dict('label')
+            obj_amount = CleanDecimal(Dict('amount'), replace_dots=True)
+
+
+class StreamingCsvPageTest(TestCase):
+    # A quoted cell on several lines, '\r\n' and '\r' newlines, and a
+    # last line without newline.
+    BODY = (b'Operations of 2015\r\n'
+            b'date,label,amount\r\n'
+            b'2015-05-20,"Coffee\r\nand croissant",-3.50\r'
+            b'2015-05-21,Salary,"1,000.00"\n'
+            b'2015-05-22,"With ""quotes""",-1')
+
+    def setUp(self):
+        self.browser = Browser()
+
+    def rows(self, klass, body, chunk_size=None):
+        page = klass(self.browser, make_response(body, 'text/csv'))
+        if chunk_size is not None:
+            page.CHUNK_SIZE = chunk_size
+        return list(page.iter_elements())
+
+    def test_same_as_csv_page(self):
+        expected = CsvPage(self.browser, make_response(self.BODY, 'text/csv')).doc
+        self.assertEqual(len(expected), 5)
+        self.assertEqual(expected[2][1], u'Coffee\nand croissant')
+        self.assertEqual(expected[4][1], u'With "quotes"')
+        # whatever is the split of chunks, and even if '\r\n' is split
+        for chunk_size in range(1, len(self.BODY) + 1):
+            self.assertEqual(self.rows(StreamingCsvPage, self.BODY, chunk_size), expected)
+
+    def test_header(self):
+        class HeaderPage(CsvPage):
+            HEADER = 2
+
+        expected = HeaderPage(self.browser, make_response(self.BODY, 'text/csv')).doc
+        for chunk_size in (1, 2, 7, 64 * 1024):
+            rows = self.rows(HeaderCsvPage, self.BODY, chunk_size)
+            self.assertTrue(all(isinstance(row, CsvRow) for row in rows))
+            self.assertEqual([dict(row.items()) for row in rows], expected)
+
+        rows = self.rows(HeaderCsvPage, self.BODY)
+        self.assertEqual(rows[0]['label'], u'Coffee\nand croissant')
+        self.assertEqual(rows[1]['amount'], u'1,000.00')
+        self.assertIs(rows[0].header, rows[1].header)
+
+    def test_without_newlines_hack(self):
+        class RawCsvPage(StreamingCsvPage):
+            NEWLINES_HACK = False
+
+        body = b'a,"b\r\nc"\r\nd,e\n'
+        for chunk_size in (1, 3, 64 * 1024):
+            self.assertEqual(self.rows(RawCsvPage, body, chunk_size),
+                             [[u'a', u'b\r\nc'], [u'd', u'e']])
+
+    def test_utf16(self):
+        text = u'date\tlabel\n2015-05-20\tCafé\n2015-05-21\tÉlève\n'
+        body = codecs.BOM_UTF16_LE + text.encode('utf-16-le')
+        for chunk_size in (1, 3, 64 * 1024):
+            rows = self.rows(Utf16CsvPage, body, chunk_size)
+            self.assertEqual([dict(row.items()) for row in rows],
+                             [{'date': u'2015-05-20', 'label': u'Café'},
+                              {'date': u'2015-05-21', 'label': u'Élève'}])
+
+    def test_list_element(self):
+        body = (b'id;label;amount\n'
+                b'1;Coffee;-3,50\n'
+                b'2;Salary;1000\n')
+        page = OperationsPage(self.browser, make_response(body, 'text/csv'))
+        operations = list(page.iter_operations())
+        self.assertEqual([(op.id, op.label) for op in operations],
+                         [(u'1', u'Coffee'), (u'2', u'Salary')])
+        self.assertEqual(operations[0].amount, Decimal('-3.50'))
+        self.assertEqual(operations[1].amount, Decimal('1000'))
+
+
+class AccountsPage(StreamingJsonPage):
+    @method
+    class iter_operations(ListElement):
+        item_tag = 'data/accounts'
+
+        class item(ItemElement):
+            klass = Operation
+
+            obj_id = Dict('id')
+            obj_label = Dict('label')
+            obj_amount = Dict('balance')
+
+
+class StreamingJsonPageTest(TestCase):
+    BODY = (b'{"count": 2, "data": {"accounts": [{"id": "1", "label": "Checking", "balance": 10.5},'
+            b' {"id": "2", "label": "Savings", "balance": 1000}], "owner": {"name": "John"}}}')
+
+    ROOT = b'[{"id": "1"}, {"id": "2", "tags": ["a", "b"]}]'
+
+    def setUp(self):
+        self.browser = Browser()
+
+    def items(self, body, path, chunk_size=None, klass=StreamingJsonPage):
+        page = klass(self.browser, make_response(body, 'application/json'))
+        if chunk_size is not None:
+            page.CHUNK_SIZE = chunk_size
+        return list(page.iter_elements(path))
+
+    def check_paths(self):
+        for chunk_size in (1, 7, 64 * 1024):
+            accounts = self.items(self.BODY, 'data/accounts', chunk_size)
+            self.assertEqual([account['id'] for account in accounts], [u'1', u'2'])
+            self.assertEqual(accounts[0]['balance'], Decimal('10.5'))
+            self.assertEqual(self.items(self.ROOT, '', chunk_size),
+                             [{'id': u'1'}, {'id': u'2', 'tags': [u'a', u'b']}])
+            self.assertEqual(self.items(self.ROOT, None, chunk_size), self.items(self.ROOT, ''))
+
+        # missing path, or path of something which is not an array
+        self.assertEqual(self.items(self.BODY, 'data/cards'), [])
+        self.assertEqual(self.items(self.BODY, 'nothing/accounts'), [])
+        self.assertEqual(self.items(self.BODY, 'data/owner'), [])
+        self.assertEqual(self.items(self.BODY, 'count/accounts'), [])
+        self.assertEqual(self.items(self.BODY, ''), [])
+
+        page = AccountsPage(self.browser, make_response(self.BODY, 'application/json'))
+        operations = list(page.iter_operations())
+        self.assertEqual([(op.id, op.label, op.amount) for op in operations],
+                         [(u'1', u'Checking', Decimal('10.5')), (u'2', u'Savings', Decimal('1000'))])
+
+    @skipIf(ijson is None, 'ijson is not installed')
+    def test_ijson(self):
+        self.check_paths()
+
+    def test_without_ijson(self):
+        # a None module makes the import fail
+        saved = sys.modules.get('ijson')
+        sys.modules['ijson'] = None
+        try:
+            self.check_paths()
+        finally:
+            if saved is None:
+                del sys.modules['ijson']
+            else:
+                sys.modules['ijson'] = saved
@@ -127,3 +127,23 @@ class URLTest(TestCase):
         self.assertRaisesRegexp(AssertionError, "You can use this method" +
                                 " only if there is a Page class handler.",
                                 self.myBrowser.urlRegex.is_here, id=2)
+
+    # Check that route returns the first URL which matches, and its params
+    def test_route(self):
+        url, params = self.myBrowser.route("http://test.com/42")
+        self.assertIs(url, self.myBrowser.urlValue)
+        self.assertEquals(params, {'id': '42'})
+
+    # Check that route works with relative urls
+    def test_route_relative(self):
+        url, params = self.myBrowser.route("/news")
+        self.assertIs(url, self.myBrowser.urlRegWithoutHttp)
+
+    # Check that route respects the order of declaration of URLs
+    def test_route_order(self):
+        url, params = self.myBrowser.route("http://test.org")
+        self.assertIs(url, self.myBrowser.urlNotRegex)
+
+    # Check that route returns None when no URL matches
+    def test_route_none(self):
+        self.assertIsNone(self.myBrowser.route("http://example.com/"))
@@ -33,6 +33,148 @@ class UrlNotResolvable(Exception):
     """
 
 
+# (regex, base) -> compiled regexp
+_regexps = {}
+
+
+def compile_url_regex(regex, base):
+    """
+    Get the compiled regexp which matches absolute urls from an :class:`URL`
+    regex, which may be relative to *base*.
+    """
+    try:
+        return _regexps[(regex, base)]
+    except KeyError:
+        full_regex = regex
+        if not re.match(r'^\w+://.*', regex):
+            full_regex = re.escape(base).rstrip('/') + '/' + regex.lstrip('/')
+        compiled = _regexps[(regex, base)] = re.compile(full_regex)
+        return compiled
+
+
+def literal_prefix(pattern):
+    r"""
+    Get the text which starts every string matched by a regexp.
+
+    >>> literal_prefix(r'http://www\.example\.org/(?P<id>\d+)')
+    'http://www.example.org/'
+    >>> literal_prefix(re.escape('http://example.org') + r'/pages?/')
+    'http://example.org/page'
+    >>> literal_prefix(r'http://a\.org|http://b\.org')
+    ''
+    """
+    if re.search(r'(^|[^\\])(\\\\)*\|', pattern):
+        # alternation
+        return ''
+
+    prefix = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            if i + 1 >= len(pattern) or pattern[i + 1].isalnum():
+                # character class like \d, or back-reference
+                break
+            c = pattern[i + 1]
+            i += 2
+        elif c in '.^$*+?{}[]()':
+            break
+        else:
+            i += 1
+
+        if i < len(pattern) and pattern[i] in '*?{':
+            # this character is optional
+            break
+        prefix.append(c)
+    return ''.join(prefix)
+
+
+class URLRouter(object):
+    """
+    Find the :class:`URL` objects of a browser which match an url.
+
+    Regexps are compiled once per browser class and base url, and indexed by
+    host, so only the URLs which may match are tried, in the order of their
+    declaration.
+
+    :param urls: URL objects by name
+    :type urls: :class:`dict`
+    :param base: base url of the browser
+    :type base: :class:`str`
+    """
+
+    _routers = {}
+
+    @classmethod
+    def get(cls, browser):
+        """
+        Get the router of a browser.
+
+        :type browser: :class:`weboob.browser.browsers.PagesBrowser`
+        """
+        key = (browser.__class__, browser.BASEURL)
+        try:
+            return cls._routers[key]
+        except KeyError:
+            router = cls._routers[key] = cls(browser.__class__._urls, browser.BASEURL)
+            return router
+
+    def __init__(self, urls, base):
+        # host -> routes, and routes of which host is not known
+        self.by_host = {}
+        self.any_host = []
+        # host -> all routes to try
+        self.candidates = {}
+
+        for i, (name, url) in enumerate(urls.iteritems()):
+            for j, regex in enumerate(url.urls):
+                compiled = compile_url_regex(regex, base)
+                if compiled.flags & re.IGNORECASE:
+                    prefix = ''
+                else:
+                    prefix = literal_prefix(compiled.pattern)
+                route = (i, j, name, prefix, compiled)
+                host = self.get_host(prefix, complete=False)
+                if host is None:
+                    self.any_host.append(route)
+                else:
+                    self.by_host.setdefault(host, []).append(route)
+
+    @staticmethod
+    def get_host(url, complete=True):
+        parts = url.split('/', 3)
+        if len(parts) < 3 or not parts[0].endswith(':') or parts[1]:
+            return None
+        if not complete and len(parts) < 4:
+            # the host may go on after the prefix
+            return None
+        return parts[2]
+
+    def iter_matches(self, url):
+        """
+        Iterate on URLs which match an url.
+
+        :returns: tuples (name of the URL object, match object)
+        """
+        host = self.get_host(url)
+        try:
+            routes = self.candidates[host]
+        except KeyError:
+            if len(self.candidates) > 100:
+                self.candidates.clear()
+            routes = self.candidates[host] = sorted(self.by_host.get(host, []) + self.any_host)
+
+        last = None
+        for i, j, name, prefix, regex in routes:
+            if name == last or not url.startswith(prefix):
+                continue
+            m = regex.match(url)
+            if m:
+                # only the first regexp of an URL object matters
+                last = name
+                yield name, m
+
+
 class URL(object):
     """
     A description of an URL on the PagesBrowser website.
@@ -161,20 +303,20 @@ class URL(object):
             base = self.browser.BASEURL
 
         for regex in self.urls:
-            if not re.match(r'^\w+://.*', regex):
-                regex = re.escape(base).rstrip('/') + '/' + regex.lstrip('/')
-            m = re.match(regex, url)
+            m = compile_url_regex(regex, base).match(url)
             if m:
                 return m
 
-    def handle(self, response):
+    def handle(self, response, match=None):
         """
         Handle a HTTP response to get an instance of the klass if it matches.
+
+        :param match: result of :meth:`match` on the response url, if already known
         """
         if self.klass is None:
             return
 
-        m = self.match(response.url)
+        m = match or self.match(response.url)
         if m:
             page = self.klass(self.browser, response, m.groupdict())
             if hasattr(page, 'is_here'):
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+from threading import Lock, local
+from weakref import WeakSet
+
+from lxml import etree
+
+from weboob.tools.ordereddict import OrderedDict
+
+
+__all__ = ['compile_xpath', 'xpath', 'xpath_cache_info', 'clear_xpath_cache']
+
+
+#: Maximum number of compiled expressions kept by each thread.
+CACHE_SIZE = 512
+
+
+class _XPathCache(object):
+    def __init__(self):
+        self.compiled = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+# lxml serializes evaluations of a compiled expression, so every thread has
+# its own cache to prevent backends from waiting for each other.
+_local = local()
+_caches = WeakSet()
+_caches_lock = Lock()
+
+
+def _get_cache():
+    try:
+        return _local.cache
+    except AttributeError:
+        cache = _local.cache = _XPathCache()
+        with _caches_lock:
+            _caches.add(cache)
+        return cache
+
+
+def compile_xpath(expr, namespaces=None, smart_strings=True):
+    """
+    Get a compiled XPath expression.
+
+    Compiled expressions are kept in a LRU cache, so a selector used on every
+    item of a list is parsed only once.
+
+    >>> from lxml import etree
+    >>> compile_xpath('//p')(etree.fromstring('<div><p>a</p><p>b</p></div>'))[1].text
+    'b'
+    >>> compile_xpath('//p') is compile_xpath('//p')
+    True
+
+    :param expr: XPath expression
+    :type expr: :class:`str`
+    :param namespaces: prefix -> URI mapping
+    :type namespaces: :class:`dict`
+    :param smart_strings: return strings which know their parent
+    :type smart_strings: :class:`bool`
+    :rtype: :class:`lxml.etree.XPath`
+    """
+    key = (expr, tuple(sorted(namespaces.items())) if namespaces else None, smart_strings)
+    cache = _get_cache()
+
+    try:
+        compiled = cache.compiled.pop(key)
+    except KeyError:
+        cache.misses += 1
+        compiled = etree.XPath(expr, namespaces=namespaces, smart_strings=smart_strings)
+        if len(cache.compiled) >= CACHE_SIZE:
+            cache.compiled.popitem(last=False)
+    else:
+        cache.hits += 1
+
+    # (re)insert it as the most recently used
+    cache.compiled[key] = compiled
+    return compiled
+
+
+def xpath(el, expr, namespaces=None, smart_strings=True, **variables):
+    """
+    Evaluate an XPath expression on an element, as ``el.xpath(expr)`` does,
+    but with a compiled expression taken from the cache.
+
+    Objects which are not lxml elements or trees (for example
+    :class:`weboob.browser.elements.AbstractElement`) are asked to evaluate
+    the expression themselves.
+
+    >>> from lxml import etree
+    >>> xpath(etree.fromstring('<div><p>a</p><p>b</p></div>'), 'count(p)')
+    2.0
+    """
+    if not isinstance(el, (etree._Element, etree._ElementTree)):
+        if namespaces is not None:
+            variables['namespaces'] = namespaces
+        if not smart_strings:
+            variables['smart_strings'] = smart_strings
+        return el.xpath(expr, **variables)
+
+    return compile_xpath(expr, namespaces, smart_strings)(el, **variables)
+
+
+def xpath_cache_info():
+    """
+    Get statistics about the cache of compiled expressions, summed over all
+    living threads.
+
+    :returns: a dict with *hits*, *misses* and *size* keys
+    :rtype: :class:`dict`
+    """
+    info = {'hits': 0, 'misses': 0, 'size': 0}
+    with _caches_lock:
+        caches = list(_caches)
+
+    for cache in caches:
+        info['hits'] += cache.hits
+        info['misses'] += cache.misses
+        info['size'] += len(cache.compiled)
+    return info
+
+
+def clear_xpath_cache():
+    """
+    Forget compiled expressions and reset counters of the current thread.
+    """
+    _local.cache = _XPathCache()
+    with _caches_lock:
+        _caches.add(_local.cache)
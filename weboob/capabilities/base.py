@@ -20,10 +20,12 @@
 
 import warnings
 import re
+import datetime
+from collections import deque
 from decimal import Decimal
 from copy import deepcopy, copy
 
-from weboob.tools.compat import unicode, long
+from weboob.tools.compat import unicode, long, basestring
 from weboob.tools.misc import to_unicode
 from weboob.tools.ordereddict import OrderedDict
 
@@ -40,10 +42,7 @@ def empty(value):
 
     :rtype: :class:`bool`
     """
-    for cls in (None, NotLoaded, NotAvailable):
-        if value is cls:
-            return True
-    return False
+    return value is None or value is NotLoaded or value is NotAvailable
 
 
 def find_object(mylist, error=None, **kwargs):
@@ -167,6 +166,45 @@ class Capability(object):
     """
 
 
+_types_by_name = {}
+
+
+def _find_types(name):
+    """
+    Get all classes with the given name.
+
+    As it walks every class of the process, results are cached.
+    """
+    try:
+        return _types_by_name[name]
+    except KeyError:
+        pass
+
+    # the following is a (almost) copy/paste from
+    # https://stackoverflow.com/questions/11775460/lexical-cast-from-string-to-type
+    found = ()
+    q = deque([object])
+    while q:
+        t = q.popleft()
+        if t.__name__ == name:
+            found += (t,)
+        else:
+            try:
+                # keep looking!
+                q.extend(t.__subclasses__())
+            except TypeError:
+                # type.__subclasses__ needs an argument for
+                # whatever reason.
+                if t is type:
+                    continue
+                else:
+                    raise
+
+    if found:
+        _types_by_name[name] = found
+    return found
+
+
 class Field(object):
     """
     Field of a :class:`BaseObject` class.
@@ -178,6 +216,9 @@ class Field(object):
     """
     _creation_counter = 0
 
+    #: Method called with every valid value before it is stored, if any.
+    normalize = None
+
     def __init__(self, doc, *args, **kwargs):
         self.types = ()
         self.value = kwargs.get('default', NotLoaded)
@@ -189,9 +230,35 @@ class Field(object):
             else:
                 raise TypeError('Arguments must be types or strings of type name')
 
+        # Types given by name may be defined later, so they are resolved on
+        # first use.
+        self._resolved_types = None
+        if not any(isinstance(t, str) for t in self.types):
+            self._resolved_types = self.types
+
         self._creation_counter = Field._creation_counter
         Field._creation_counter += 1
 
+    @property
+    def resolved_types(self):
+        """
+        Types accepted by the field, where type names are replaced by the
+        classes which have this name.
+        """
+        if self._resolved_types is None:
+            types = ()
+            for t in self.types:
+                if isinstance(t, str):
+                    found = _find_types(t)
+                    if not found:
+                        # not defined yet
+                        return types
+                    types += found
+                else:
+                    types += (t,)
+            self._resolved_types = types
+        return self._resolved_types
+
     def convert(self, value):
         """
         Convert value to the wanted one.
@@ -263,6 +330,16 @@ class BytesField(Field):
         return str(value)
 
 
+# Values of these types can't be changed in place, so they are not copied:
+# default values of fields are shared by all objects.
+_IMMUTABLE_TYPES = (str, unicode, int, long, float, bool, type(None), Decimal,
+                    datetime.date, datetime.datetime, datetime.time, datetime.timedelta,
+                    NotAvailableType, NotLoadedType)
+
+# Value of a field which has been deleted from an object.
+_DELETED = object()
+
+
 class _BaseObjectMeta(type):
     def __new__(cls, name, bases, attrs):
         fields = [(field_name, attrs.pop(field_name)) for field_name, obj in attrs.items() if isinstance(obj, Field)]
@@ -275,6 +352,14 @@ class _BaseObjectMeta(type):
             new_class._fields = deepcopy(new_class._fields)
         new_class._fields.update(fields)
 
+        # Fields are shared by all objects of the class, which only store
+        # a list of values, in the order of fields.
+        new_class._field_index = dict((field_name, (i, field))
+                                      for i, (field_name, field) in enumerate(new_class._fields.iteritems()))
+        new_class._defaults = [field.value for field in new_class._fields.itervalues()]
+        new_class._mutable_defaults = [i for i, value in enumerate(new_class._defaults)
+                                       if not isinstance(value, _IMMUTABLE_TYPES)]
+
         if new_class.__doc__ is None:
             new_class.__doc__ = ''
         for name, field in fields:
@@ -316,9 +401,16 @@ class BaseObject(object):
     _fields = None
 
     def __init__(self, id=u'', backend=None):
+        self._init_values()
         self.id = to_unicode(id)
         self.backend = backend
-        self._fields = deepcopy(self._fields)
+
+    def _init_values(self):
+        values = list(self._defaults)
+        for i in self._mutable_defaults:
+            values[i] = deepcopy(values[i])
+        self.__dict__['_values'] = values
+        return values
 
     @property
     def fullid(self):
@@ -344,7 +436,8 @@ class BaseObject(object):
 
     def copy(self):
         obj = copy(self)
-        obj._fields = copy(self._fields)
+        if '_values' in self.__dict__:
+            obj.__dict__['_values'] = list(self._values)
         return obj
 
     def __deepcopy__(self, memo):
@@ -372,8 +465,10 @@ class BaseObject(object):
 
         if hasattr(self, 'id') and self.id is not None:
             yield 'id', self.id
-        for name, field in self._fields.iteritems():
-            yield name, field.value
+        values = self.__dict__.get('_values') or self._init_values()
+        for name, value in zip(self._fields, values):
+            if value is not _DELETED:
+                yield name, value
 
     def __eq__(self, obj):
         if isinstance(obj, BaseObject):
@@ -382,22 +477,34 @@ class BaseObject(object):
             return False
 
     def __getattr__(self, name):
-        if self._fields is not None and name in self._fields:
-            return self._fields[name].value
+        try:
+            index, field = self._field_index[name]
+        except (KeyError, AttributeError):
+            pass
         else:
-            raise AttributeError("'%s' object has no attribute '%s'" % (
-                self.__class__.__name__, name))
+            try:
+                values = self.__dict__['_values']
+            except KeyError:
+                values = self._init_values()
+            if values[index] is not _DELETED:
+                return values[index]
+
+        raise AttributeError("'%s' object has no attribute '%s'" % (
+            self.__class__.__name__, name))
 
     def __setattr__(self, name, value):
         try:
-            attr = (self._fields or {})[name]
+            index, attr = self._field_index[name]
         except KeyError:
-            if name not in dir(self) and not name.startswith('_'):
+            if not name.startswith('_') and name not in self.__dict__ and not hasattr(type(self), name):
                 warnings.warn('Creating a non-field attribute %s. Please prefix it with _' % name,
                               AttributeCreationWarning, stacklevel=2)
             object.__setattr__(self, name, value)
         else:
-            if not empty(value):
+            types = attr.resolved_types
+            # Values which already have one of the wanted types do not need
+            # to be converted.
+            if not empty(value) and type(value) not in types:
                 try:
                     # Try to convert value to the wanted one.
                     nvalue = attr.convert(value)
@@ -412,42 +519,30 @@ class BaseObject(object):
                     # match the wanted following types, so we'll
                     # raise ValueError.
                     pass
-            from collections import deque
-            actual_types=()
-            for v in attr.types:
-                if isinstance(v,str):
-                    # the following is a (almost) copy/paste from
-                    # https://stackoverflow.com/questions/11775460/lexical-cast-from-string-to-type
-                    q=deque([object])
-                    while q:
-                        t=q.popleft()
-                        if t.__name__ == v:
-                            actual_types+=(t,)
-                        else:
-                            try:
-                                # keep looking!
-                                q.extend(t.__subclasses__())
-                            except TypeError:
-                                # type.__subclasses__ needs an argument for
-                                # whatever reason.
-                                if t is type:
-                                    continue
-                                else:
-                                    raise
-                else:
-                    actual_types+=(v,)
 
-            if not isinstance(value, actual_types) and not empty(value):
+            if not isinstance(value, types) and not empty(value):
                 raise ValueError(
                     'Value for "%s" needs to be of type %r, not %r' % (
-                        name, actual_types, type(value)))
-            attr.value = value
+                        name, types, type(value)))
+            if attr.normalize is not None:
+                value = attr.normalize(value)
+
+            try:
+                values = self.__dict__['_values']
+            except KeyError:
+                values = self._init_values()
+            values[index] = value
 
     def __delattr__(self, name):
         try:
-            self._fields.pop(name)
+            index, field = self._field_index[name]
         except KeyError:
             object.__delattr__(self, name)
+        else:
+            values = self.__dict__.get('_values') or self._init_values()
+            if values[index] is _DELETED:
+                raise AttributeError(name)
+            values[index] = _DELETED
 
     def to_dict(self):
         def iter_decorate(d):
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+# This module requires Python 3.5 or later. It doesn't use the async/await
+# syntax, so it can still be byte-compiled by Python 2.
+
+import asyncio
+import weakref
+
+from weboob.core.bcall import CallErrors, FINISHED
+
+
+__all__ = ['AsyncBackendsCall']
+
+
+class AsyncBackendsCall(object):
+    """
+    asyncio front-end of :class:`weboob.core.bcall.BackendsCall`.
+
+    Results can be iterated as soon as backends yield them::
+
+        async for obj in weboob.ado('iter_accounts'):
+            print(obj)
+
+    or all be collected at once::
+
+        objs = await weboob.ado('iter_accounts')
+
+    In both cases, errors are raised at the end as
+    :class:`weboob.core.bcall.CallErrors`. If the task is cancelled while
+    it waits for a result, or if :func:`aclose` is called, the call on
+    backends is cancelled too.
+
+    To stop an iteration before the end, use it as an asynchronous context
+    manager, so the call is cancelled when the block is left::
+
+        async with weboob.ado('iter_accounts') as accounts:
+            async for account in accounts:
+                if account.id == '1234':
+                    break
+
+    Otherwise, the call is only cancelled once this object is garbage
+    collected. Until then, a call with a *maxsize* keeps its backends
+    paused, and next calls on these backends wait.
+
+    .. note:: Only the core of weboob runs on Python 3: ``weboob.browser``,
+              most capabilities and applications still use Python 2 syntax
+              and can't be imported. So backends of the existing modules
+              can't be called from asyncio yet.
+
+    :param call: the underlying call
+    :type call: :class:`weboob.core.bcall.BackendsCall`
+    :param loop: event loop to use; default is the current one
+    :type loop: :class:`asyncio.AbstractEventLoop`
+    """
+
+    def __init__(self, call, loop=None):
+        self.call = call
+        self.loop = loop or asyncio.get_event_loop()
+        self._waiter = None
+        self._timer = None
+        # The call keeps only a weak reference on this object, so it can be
+        # collected when the consumer leaves an 'async for' loop.
+        self.call.listeners.append(self._make_listener(weakref.ref(self)))
+        weakref.finalize(self, call.cancel)
+
+    @staticmethod
+    def _make_listener(ref):
+        def listener():
+            # Called from workers threads.
+            self = ref()
+            if self is None:
+                return
+            try:
+                self.loop.call_soon_threadsafe(self._wakeup)
+            except RuntimeError:
+                # loop is closed
+                pass
+        return listener
+
+    def _wakeup(self):
+        waiter = self._waiter
+        if waiter is None or waiter.done():
+            return
+
+        while True:
+            try:
+                response = self.call.next_response(block=False)
+            except StopIteration:
+                self._waiter = None
+                if self.call.errors:
+                    waiter.set_exception(CallErrors(self.call.errors))
+                else:
+                    waiter.set_exception(StopAsyncIteration())
+                return
+
+            if response is None:
+                # Nothing yet: wait for the next response, or for the next
+                # deadline to be checked.
+                delay = self.call.check_deadlines()
+                if delay is not None and self._timer is None:
+                    self._timer = self.loop.call_later(delay, self._on_timer)
+                return
+
+            backend, result = response
+            if result is not FINISHED:
+                self._waiter = None
+                waiter.set_result(result)
+                return
+
+    def _on_timer(self):
+        self._timer = None
+        self._wakeup()
+
+    def _on_waiter_done(self, waiter):
+        if waiter.cancelled():
+            if self._waiter is waiter:
+                self._waiter = None
+            self.cancel()
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        assert self._waiter is None, 'Only one coroutine can wait for results'
+
+        waiter = self.loop.create_future()
+        waiter.add_done_callback(self._on_waiter_done)
+        self._waiter = waiter
+        self._wakeup()
+        return waiter
+
+    def __await__(self):
+        return self.gather().__await__()
+
+    def __aenter__(self):
+        future = self.loop.create_future()
+        future.set_result(self)
+        return future
+
+    def __aexit__(self, exc_type, exc_value, traceback):
+        return self.aclose()
+
+    def gather(self):
+        """
+        Collect all results.
+
+        :returns: a future whose result is the list of results
+        :rtype: :class:`asyncio.Future`
+        """
+        future = self.loop.create_future()
+        results = []
+
+        def step(waiter=None):
+            if future.done():
+                # gather() has been cancelled
+                if waiter is not None and not waiter.cancelled():
+                    waiter.exception()
+                return
+            if waiter is not None:
+                if waiter.cancelled():
+                    future.cancel()
+                    return
+                error = waiter.exception()
+                if isinstance(error, StopAsyncIteration):
+                    future.set_result(results)
+                    return
+                if error is not None:
+                    future.set_exception(error)
+                    return
+                results.append(waiter.result())
+            self.__anext__().add_done_callback(step)
+
+        def on_done(future):
+            if future.cancelled():
+                self.cancel()
+
+        future.add_done_callback(on_done)
+        step()
+        return future
+
+    def cancel(self):
+        """
+        Cancel the call on backends.
+        """
+        self.call.cancel()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def aclose(self):
+        """
+        Stop the iteration and cancel the call on backends.
+        """
+        self.cancel()
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.cancel()
+        self._waiter = None
+
+        future = self.loop.create_future()
+        future.set_result(None)
+        return future
@@ -19,18 +19,17 @@
 
 
 from copy import copy
-from threading import Thread
-try:
-    import Queue
-except ImportError:
-    import queue as Queue
+from collections import deque
+from threading import Thread, Condition, Event, current_thread, _MainThread
+from time import time
 
 from weboob.capabilities.base import BaseObject
+from weboob.tools.compat import basestring
 from weboob.tools.misc import get_backtrace
 from weboob.tools.log import getLogger
 
 
-__all__ = ['BackendsCall', 'CallErrors']
+__all__ = ['BackendsCall', 'CallErrors', 'CallTimeout']
 
 
 class CallErrors(Exception):
@@ -46,6 +45,21 @@ class CallErrors(Exception):
         return self.errors.__iter__()
 
 
+class CallTimeout(Exception):
+    """
+    Stored in :class:`CallErrors` when a backend didn't finish in time.
+    """
+
+    def __init__(self, backend, timeout):
+        Exception.__init__(self, 'Call timed out after %ss' % timeout)
+        self.backend = backend
+        self.timeout = timeout
+
+
+# Put in the responses queue when a backend has finished.
+FINISHED = object()
+
+
 class BackendsCall(object):
     def __init__(self, backends, function, *args, **kwargs):
         """
@@ -53,16 +67,193 @@ class BackendsCall(object):
         :type backends: list[:class:`Module`]
         :param function: backends' method name, or callable object.
         :type function: :class:`str` or :class:`callable`
+
+        Other arguments are given to *function*, except the following keyword
+        arguments, which are options of the call (so backends' methods can't
+        take arguments with these names):
+
+        :param pool: pool of workers where calls are run. If None, one thread
+                     is created for each backend.
+        :type pool: :class:`weboob.core.workers.WorkerPool`
+        :param timeout: maximum duration of the whole call, in seconds
+        :type timeout: :class:`float`
+        :param per_backend_timeout: maximum duration of the call of each
+                                    backend, since it has started, in seconds
+        :type per_backend_timeout: :class:`float`
+
+        :param maxsize: maximum number of results waiting to be consumed.
+                        When it is reached, backends are paused until the
+                        consumer catches up, so the consumer has to read
+                        all results or to call :func:`cancel`.
+        :type maxsize: :class:`int`
+
+        When a backend exceeds a timeout, a :class:`CallTimeout` error is
+        stored for it, its next results are dropped and the iteration on its
+        results is stopped.
+
+        When the iteration on results is stopped before the end, the call is
+        cancelled on backends which have not finished yet.
         """
+        pool = kwargs.pop('pool', None)
+        timeout = kwargs.pop('timeout', None)
+        per_backend_timeout = kwargs.pop('per_backend_timeout', None)
+        maxsize = kwargs.pop('maxsize', None)
+
         self.logger = getLogger('bcall')
 
-        self.responses = Queue.Queue()
+        self.cond = Condition()
+        # (backend, result) tuples, and (backend, FINISHED) when a backend is over.
+        self.responses = deque()
+        self.maxsize = maxsize
         self.errors = []
-        self.tasks = Queue.Queue()
+        self.remaining = len(backends)
+        # backend name -> Event set when the backend has finished
+        self.events = dict((backend.name, Event()) for backend in backends)
+
+        self.timeout = timeout
+        self.per_backend_timeout = per_backend_timeout
+        self.deadline = time() + timeout if timeout is not None else None
+        # backend name -> backend which has not finished yet
+        self.pending = dict((backend.name, backend) for backend in backends)
+        # backend name -> time when its call has started
+        self.started = {}
+        # functions called (in producer threads) when a response is available
+        self.listeners = []
 
         for backend in backends:
-            Thread(target=self.backend_process, args=(function, args, kwargs)).start()
-            self.tasks.put(backend)
+            if pool is not None:
+                pool.submit(backend, self.backend_process, backend, function, args, kwargs)
+            else:
+                Thread(target=self.backend_process, args=(backend, function, args, kwargs)).start()
+
+    def _push(self, backend, result):
+        with self.cond:
+            if self.maxsize and result is not FINISHED:
+                # backpressure: wait for the consumer to catch up
+                delay = self.check_deadlines()
+                while len(self.responses) >= self.maxsize and backend.name in self.pending:
+                    self._wait(delay)
+                    delay = self.check_deadlines()
+
+            if backend.name not in self.pending:
+                # backend has been cancelled
+                return
+
+            self.responses.append((backend, result))
+            if result is FINISHED:
+                self.pending.pop(backend.name)
+                self.remaining -= 1
+                self.events[backend.name].set()
+            self.cond.notify_all()
+
+        for listener in self.listeners:
+            listener()
+
+    def _cancel(self, backend, error=None):
+        with self.cond:
+            if backend.name not in self.pending:
+                return
+
+            if error is not None:
+                self.errors.append((backend, error, ''))
+            self._push(backend, FINISHED)
+
+    def cancel(self):
+        """
+        Stop the call on every backend which has not finished yet.
+
+        Responses already received can still be consumed.
+        """
+        with self.cond:
+            for backend in list(self.pending.values()):
+                self._cancel(backend)
+
+    def is_cancelled(self, backend):
+        """
+        Check if the call has to stop for this backend.
+
+        Expired deadlines are checked at the same time.
+
+        :rtype: :class:`bool`
+        """
+        self.check_deadlines()
+        return backend.name not in self.pending
+
+    def check_deadlines(self):
+        """
+        Cancel backends which have exceeded their deadline.
+
+        :returns: the delay before the next deadline, or None
+        """
+        if self.deadline is None and self.per_backend_timeout is None:
+            return None
+
+        now = time()
+        next_deadline = None
+        with self.cond:
+            for name, backend in list(self.pending.items()):
+                deadline, timeout = self.deadline, self.timeout
+                if self.per_backend_timeout is not None and name in self.started:
+                    backend_deadline = self.started[name] + self.per_backend_timeout
+                    if deadline is None or backend_deadline < deadline:
+                        deadline, timeout = backend_deadline, self.per_backend_timeout
+
+                if deadline is None:
+                    continue
+                if deadline <= now:
+                    self.logger.debug('%s: call timed out after %ss', backend, timeout)
+                    self._cancel(backend, CallTimeout(backend, timeout))
+                elif next_deadline is None or deadline < next_deadline:
+                    next_deadline = deadline
+
+        if next_deadline is None:
+            return None
+        return next_deadline - now
+
+    def _wait(self, timeout=None):
+        # On Python 2, a wait without timeout can't be interrupted by SIGINT,
+        # so the main thread wakes up from time to time to handle ^C.
+        if isinstance(current_thread(), _MainThread):
+            timeout = min(timeout, 1) if timeout is not None else 1
+        self.cond.wait(timeout)
+
+    def next_response(self, block=True):
+        """
+        Get the next response, as a (backend, result) tuple. *result* is
+        :data:`FINISHED` when the backend has finished.
+
+        :param block: if False, do not wait for a response to come
+        :type block: :class:`bool`
+        :returns: the response, or None if *block* is False and there is no
+                  available response yet
+        :raises: :class:`StopIteration` if the call is over
+        """
+        with self.cond:
+            delay = self.check_deadlines()
+            while block and not self.responses and self.remaining:
+                self._wait(delay)
+                delay = self.check_deadlines()
+
+            if self.responses:
+                if self.maxsize:
+                    # wake up paused backends
+                    self.cond.notify_all()
+                return self.responses.popleft()
+            if self.remaining:
+                return None
+            raise StopIteration()
+
+    def _iter_responses(self):
+        """
+        Iterate on (backend, result) tuples as soon as they come, and on
+        (backend, FINISHED) when a backend has finished.
+        """
+        while True:
+            try:
+                response = self.next_response()
+            except StopIteration:
+                return
+            yield response
 
     def store_result(self, backend, result):
         if result is None:
@@ -70,12 +261,22 @@ class BackendsCall(object):
 
         if isinstance(result, BaseObject):
             result.backend = backend.name
-        self.responses.put(result)
+        self._push(backend, result)
 
-    def backend_process(self, function, args, kwargs):
-        backend = self.tasks.get()
-        with backend:
-            try:
+    def store_error(self, backend, error):
+        with self.cond:
+            if backend.name in self.pending:
+                self.errors.append((backend, error, get_backtrace(error)))
+
+    def backend_process(self, backend, function, args, kwargs):
+        if self.is_cancelled(backend):
+            return
+
+        with self.cond:
+            self.started[backend.name] = time()
+
+        try:
+            with backend:
                 # Call method on backend
                 try:
                     self.logger.debug('%s: Calling function %s', backend, function)
@@ -85,7 +286,7 @@ class BackendsCall(object):
                         result = getattr(backend, function)(*args, **kwargs)
                 except Exception as error:
                     self.logger.debug('%s: Called function %s raised an error: %r', backend, function, error)
-                    self.errors.append((backend, error, get_backtrace(error)))
+                    self.store_error(backend, error)
                 else:
                     self.logger.debug('%s: Called function %s returned: %r', backend, function, result)
 
@@ -93,22 +294,23 @@ class BackendsCall(object):
                         # Loop on iterator
                         try:
                             for subresult in result:
+                                if self.is_cancelled(backend):
+                                    self.logger.debug('%s: call cancelled, stop iterating', backend)
+                                    if hasattr(result, 'close'):
+                                        result.close()
+                                    break
                                 self.store_result(backend, subresult)
                         except Exception as error:
-                            self.errors.append((backend, error, get_backtrace(error)))
+                            self.store_error(backend, error)
                     else:
                         self.store_result(backend, result)
-            finally:
-                self.tasks.task_done()
+        finally:
+            self._push(backend, FINISHED)
 
     def _callback_thread_run(self, callback, errback, finishback):
-        while self.tasks.unfinished_tasks or not self.responses.empty():
-            try:
-                response = self.responses.get(timeout=0.1)
-                if callback:
-                    callback(response)
-            except Queue.Empty:
-                continue
+        for backend, response in self._iter_responses():
+            if callback and response is not FINISHED:
+                callback(response)
 
         # Raise errors
         while errback and self.errors:
@@ -136,17 +338,58 @@ class BackendsCall(object):
         return thread
 
     def wait(self):
-        self.tasks.join()
+        with self.cond:
+            delay = self.check_deadlines()
+            while self.remaining:
+                self._wait(delay)
+                delay = self.check_deadlines()
+
+        if self.errors:
+            raise CallErrors(self.errors)
+
+    def wait_backend(self, backend, timeout=None):
+        """
+        Wait for a backend to finish its call.
+
+        :param backend: backend or name of backend
+        :type backend: :class:`Module` or :class:`str`
+        :param timeout: maximum time to wait, in seconds
+        :type timeout: :class:`float`
+        :returns: True if the backend has finished
+        :rtype: :class:`bool`
+        """
+        return self.events[getattr(backend, 'name', backend)].wait(timeout)
+
+    def iter_by_backend(self):
+        """
+        Iterate on backends as soon as each one has finished, with the list
+        of its results.
+
+        :rtype: iter[(:class:`Module`, list)]
+        """
+        results = {}
+        try:
+            for backend, response in self._iter_responses():
+                if response is FINISHED:
+                    yield backend, results.pop(backend.name, [])
+                else:
+                    results.setdefault(backend.name, []).append(response)
+        except GeneratorExit:
+            self.cancel()
+            raise
 
         if self.errors:
             raise CallErrors(self.errors)
 
     def __iter__(self):
-        while self.tasks.unfinished_tasks or not self.responses.empty():
-            try:
-                yield self.responses.get(timeout=0.1)
-            except Queue.Empty:
-                continue
+        try:
+            for backend, response in self._iter_responses():
+                if response is not FINISHED:
+                    yield response
+        except GeneratorExit:
+            # consumer doesn't want more results
+            self.cancel()
+            raise
 
         if self.errors:
             raise CallErrors(self.errors)
@@ -20,12 +20,18 @@
 import os
 import imp
 import logging
+from threading import RLock
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
 
 from weboob.tools.backend import Module
 from weboob.tools.log import getLogger
 
 
-__all__ = ['LoadedModule', 'ModulesLoader', 'RepositoryModulesLoader', 'ModuleLoadError']
+__all__ = ['LazyBackend', 'LoadedModule', 'ModuleIndex', 'ModulesLoader', 'RepositoryModulesLoader', 'ModuleLoadError']
 
 
 class ModuleLoadError(Exception):
@@ -34,59 +40,360 @@ class ModuleLoadError(Exception):
         self.module = module_name
 
 
+def get_tree_mtime(path):
+    """
+    Get the last modification time of files of a directory tree.
+    """
+    mtime = 0
+    for root, dirs, files in os.walk(path):
+        for f in files:
+            if f.endswith(('.pyc', '.pyo')):
+                continue
+            mtime = max(mtime, os.path.getmtime(os.path.join(root, f)))
+    return mtime
+
+
+class ModuleIndex(object):
+    """
+    Index of modules attributes, to know them without importing the
+    modules packages.
+
+    Entries are stored with the last modification time of the module, and
+    are ignored once the module has changed.
+
+    :param path: file where the index is stored
+    :type path: :class:`str`
+    """
+
+    def __init__(self, path):
+        self.logger = getLogger('modules.index')
+        self.path = path
+        self.entries = {}
+        self.lock = RLock()
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'rb') as fp:
+                    self.entries = pickle.load(fp)
+            except Exception as e:
+                self.logger.warning('Unable to read modules index %s: %s', path, e)
+
+    def get(self, module_path):
+        """
+        Get the attributes of a module, if they are still valid.
+
+        :param module_path: directory of the module package
+        :type module_path: :class:`str`
+        :rtype: :class:`dict` or None
+        """
+        entry = self.entries.get(module_path)
+        if entry is None or entry['mtime'] != get_tree_mtime(module_path):
+            return None
+        return entry
+
+    def set(self, module_path, klass):
+        """
+        Store attributes of a module class.
+
+        :param module_path: directory of the module package
+        :type module_path: :class:`str`
+        :param klass: class of the module
+        :type klass: :class:`weboob.tools.backend.Module`
+        """
+        entry = {'mtime': get_tree_mtime(module_path),
+                 'name': klass.NAME,
+                 'version': klass.VERSION,
+                 'maintainer': klass.MAINTAINER,
+                 'email': klass.EMAIL,
+                 'description': klass.DESCRIPTION,
+                 'license': klass.LICENSE,
+                 'icon': klass.ICON,
+                 'website': LoadedModule.get_website(klass),
+                 'caps': [cap.__name__ for cap in klass.iter_caps()],
+                }
+        try:
+            # ValuesDict can't be unpickled directly, as its constructor
+            # takes values as arguments.
+            entry['config'] = pickle.dumps((type(klass.CONFIG), list(klass.CONFIG.values())), 2)
+        except Exception:
+            # the module has to be imported to know its configuration
+            entry['config'] = None
+
+        with self.lock:
+            self.entries[module_path] = entry
+            self.save()
+
+    def save(self):
+        tmp = '%s.tmp' % self.path
+        try:
+            with open(tmp, 'wb') as fp:
+                pickle.dump(self.entries, fp, 2)
+            os.rename(tmp, self.path)
+        except (IOError, OSError) as e:
+            self.logger.warning('Unable to save modules index %s: %s', self.path, e)
+
+
+class LazyBackend(object):
+    """
+    Backend of a module which package is not imported yet.
+
+    The configuration is checked at creation, against the configuration of
+    the module read from the index. The package is imported, and the real
+    backend created, when an attribute which is not known by the index is
+    accessed; then every attribute is read on the real backend.
+
+    :param module: module of the backend
+    :type module: :class:`LoadedModule`
+    :param weboob: weboob instance
+    :type weboob: :class:`weboob.core.ouiboube.Weboob`
+    :param name: name of backend
+    :type name: :class:`str`
+    :param config: configuration of backend
+    :type config: :class:`dict`
+    :param storage: storage object
+    :type storage: :class:`weboob.tools.storage.IStorage`
+    :raises: :class:`weboob.tools.backend.Module.ConfigError`
+    """
+
+    # Attributes of the module class, and their keys in the index entry.
+    MODULE_ATTRS = {'NAME': 'name',
+                    'MAINTAINER': 'maintainer',
+                    'EMAIL': 'email',
+                    'VERSION': 'version',
+                    'DESCRIPTION': 'description',
+                    'LICENSE': 'license',
+                    'ICON': 'icon',
+                   }
+
+    def __init__(self, module, weboob, name, config=None, storage=None):
+        if config is None:
+            config = {}
+
+        self.weboob = weboob
+        self.name = name
+        self.lock = RLock()
+        self._module = module
+        self._params = config
+        self._storage = storage
+        self._backend = None
+        self._config = module.config.load(weboob, module.name, name, config)
+
+    def __enter__(self):
+        self.lock.acquire()
+
+    def __exit__(self, t, v, tb):
+        self.lock.release()
+
+    def __repr__(self):
+        return u"<Backend %r>" % self.name
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        if self._backend is None and attr in self.MODULE_ATTRS:
+            return self._module._get(self.MODULE_ATTRS[attr], attr)
+        return getattr(self.get_backend(), attr)
+
+    @property
+    def is_created(self):
+        return self._backend is not None
+
+    def get_backend(self):
+        """
+        Get the real backend, and create it if it is not already.
+
+        :raises: :class:`ModuleLoadError`
+        :rtype: :class:`weboob.tools.backend.Module`
+        """
+        if self._backend is not None:
+            return self._backend
+
+        with self.lock:
+            if self._backend is not None:
+                return self._backend
+
+            params = dict(self._params)
+            for key, value in self._config.iteritems():
+                if value.is_command(params.get(key)):
+                    # do not call the external tool again
+                    params[key] = value.dump()
+
+            module = self._module
+            backend = module.klass(self.weboob, self.name, params, self._storage, module.logger)
+            module.logger.debug(u'Created backend "%s" for module "%s"' % (self.name, module.name))
+            # the backend may already be locked by its proxy
+            backend.lock = self.lock
+            self._backend = backend
+        return self._backend
+
+    def has_caps(self, *caps):
+        """
+        Check if this backend implements at least one of these capabilities.
+        """
+        if self._backend is not None:
+            return self._backend.has_caps(*caps)
+
+        names = []
+        for c in caps:
+            names.extend(c if isinstance(c, (tuple, list)) else [c])
+        return self._module.has_caps(*names)
+
+    def deinit(self):
+        """
+        Deinit the real backend, if it has been created.
+        """
+        if self._backend is not None:
+            self._backend.deinit()
+
+
 class LoadedModule(object):
-    def __init__(self, package):
+    """
+    Module of weboob.
+
+    The package of the module can be imported only when its class is
+    used. Until then, attributes of the module are read from an index entry,
+    and backends are :class:`LazyBackend` objects.
+
+    :param package: package of the module, or its name if it is not
+                    imported yet
+    :param path: directory where the package is, if it is not imported yet
+    :type path: :class:`str`
+    :param entry: attributes of the module, from :class:`ModuleIndex`
+    :type entry: :class:`dict`
+    """
+
+    def __init__(self, package, path=None, entry=None):
         self.logger = getLogger('backend')
-        self.package = package
-        self.klass = None
-        for attrname in dir(self.package):
-            attr = getattr(self.package, attrname)
+        self.path = path
+        self.entry = entry
+        self.lock = RLock()
+        self._package = None
+        self._klass = None
+        self._config = None
+
+        if isinstance(package, basestring):
+            self.module_name = package
+        else:
+            self.module_name = package.__name__
+            self._set_package(package)
+
+    def _set_package(self, package):
+        klass = None
+        for attrname in dir(package):
+            attr = getattr(package, attrname)
             if isinstance(attr, type) and issubclass(attr, Module) and attr != Module:
-                self.klass = attr
-        if not self.klass:
+                klass = attr
+        if not klass:
             raise ImportError('%s is not a backend (no Module class found)' % package)
+        self._package = package
+        self._klass = klass
+
+    def load(self):
+        """
+        Import the package of the module, if it is not already.
+
+        :raises: :class:`ModuleLoadError`
+        """
+        if self._klass is not None:
+            return
+
+        with self.lock:
+            if self._klass is not None:
+                return
+            try:
+                fp, pathname, description = imp.find_module(self.module_name, [self.path])
+                try:
+                    self._set_package(imp.load_module(self.module_name, fp, pathname, description))
+                finally:
+                    if fp:
+                        fp.close()
+            except Exception as e:
+                if logging.root.level <= logging.DEBUG:
+                    self.logger.exception(e)
+                raise ModuleLoadError(self.module_name, e)
+
+    @property
+    def is_loaded(self):
+        return self._klass is not None
+
+    @property
+    def package(self):
+        self.load()
+        return self._package
+
+    @property
+    def klass(self):
+        self.load()
+        return self._klass
+
+    def _get(self, key, attr):
+        if self._klass is None and self.entry is not None:
+            return self.entry[key]
+        return getattr(self.klass, attr)
 
     @property
     def name(self):
-        return self.klass.NAME
+        return self._get('name', 'NAME')
 
     @property
     def maintainer(self):
-        return u'%s <%s>' % (self.klass.MAINTAINER, self.klass.EMAIL)
+        return u'%s <%s>' % (self._get('maintainer', 'MAINTAINER'), self._get('email', 'EMAIL'))
 
     @property
     def version(self):
-        return self.klass.VERSION
+        return self._get('version', 'VERSION')
 
     @property
     def description(self):
-        return self.klass.DESCRIPTION
+        return self._get('description', 'DESCRIPTION')
 
     @property
     def license(self):
-        return self.klass.LICENSE
+        return self._get('license', 'LICENSE')
 
     @property
     def config(self):
+        if self._config is None and self._klass is None and \
+           self.entry is not None and self.entry['config'] is not None:
+            try:
+                config_class, values = pickle.loads(self.entry['config'])
+                self._config = config_class(*values)
+            except Exception as e:
+                self.logger.debug('Unable to read configuration of %s from index: %s', self.module_name, e)
+                self.entry['config'] = None
+        if self._config is not None:
+            return self._config
         return self.klass.CONFIG
 
-    @property
-    def website(self):
-        if self.klass.BROWSER and hasattr(self.klass.BROWSER, 'BASEURL') and self.klass.BROWSER.BASEURL:
-            return self.klass.BROWSER.BASEURL
-        if self.klass.BROWSER and hasattr(self.klass.BROWSER, 'DOMAIN') and self.klass.BROWSER.DOMAIN:
-            return '%s://%s' % (self.klass.BROWSER.PROTOCOL, self.klass.BROWSER.DOMAIN)
+    @staticmethod
+    def get_website(klass):
+        if klass.BROWSER and hasattr(klass.BROWSER, 'BASEURL') and klass.BROWSER.BASEURL:
+            return klass.BROWSER.BASEURL
+        if klass.BROWSER and hasattr(klass.BROWSER, 'DOMAIN') and klass.BROWSER.DOMAIN:
+            return '%s://%s' % (klass.BROWSER.PROTOCOL, klass.BROWSER.DOMAIN)
         else:
             return None
 
+    @property
+    def website(self):
+        if self._klass is None and self.entry is not None:
+            return self.entry['website']
+        return self.get_website(self.klass)
+
     @property
     def icon(self):
-        return self.klass.ICON
+        return self._get('icon', 'ICON')
 
     def iter_caps(self):
         return self.klass.iter_caps()
 
     def has_caps(self, *caps):
+        if self._klass is None and self.entry is not None:
+            for c in caps:
+                if (c if isinstance(c, basestring) else c.__name__) in self.entry['caps']:
+                    return True
+            return False
+
         for c in caps:
             if (isinstance(c, basestring) and c in [cap.__name__ for cap in self.iter_caps()]) or \
                (type(c) == type and issubclass(self.klass, c)):
@@ -94,7 +401,18 @@ class LoadedModule(object):
         return False
 
     def create_instance(self, weboob, instance_name, config, storage):
-        backend_instance = self.klass(weboob, instance_name, config, storage, self.logger)
+        """
+        Create a backend of this module.
+
+        If the package of the module is not imported yet, a
+        :class:`LazyBackend` is returned.
+
+        :raises: :class:`weboob.tools.backend.Module.ConfigError`
+        """
+        if self.is_loaded:
+            backend_instance = self.klass(weboob, instance_name, config, storage, self.logger)
+        else:
+            backend_instance = LazyBackend(self, weboob, instance_name, config, storage)
         self.logger.debug(u'Created backend "%s" for module "%s"' % (instance_name, self.name))
         return backend_instance
 
@@ -102,17 +420,29 @@ class LoadedModule(object):
 class ModulesLoader(object):
     """
     Load modules.
+
+    :param path: directory of modules
+    :type path: :class:`str`
+    :param version: version of weboob required by modules
+    :type version: :class:`str`
+    :param index: index of modules, used to not import their packages until
+                  their classes are used
+    :type index: :class:`ModuleIndex`
     """
 
-    def __init__(self, path, version=None):
+    def __init__(self, path, version=None, index=None):
         self.version = version
         self.path = path
         self.loaded = {}
         self.logger = getLogger('modules')
+        self.index = index
 
     def get_or_load_module(self, module_name):
         """
         Can raise a ModuleLoadError exception.
+
+        If the module is known by the index, its package is imported only
+        when its class is used, for example when one of its backends is.
         """
         if module_name not in self.loaded:
             self.load_module(module_name)
@@ -136,29 +466,26 @@ class ModulesLoader(object):
 
     def load_module(self, module_name):
         if module_name in self.loaded:
-            self.logger.debug('Module "%s" is already loaded from %s' % (module_name, self.loaded[module_name].package.__path__[0]))
+            self.logger.debug('Module "%s" is already loaded from %s' % (module_name, self.loaded[module_name].path))
             return
 
         path = self.get_module_path(module_name)
+        module_path = os.path.join(path, module_name)
 
-        try:
-            fp, pathname, description = imp.find_module(module_name, [path])
-            try:
-                module = LoadedModule(imp.load_module(module_name, fp, pathname, description))
-            finally:
-                if fp:
-                    fp.close()
-        except Exception as e:
-            if logging.root.level <= logging.DEBUG:
-                self.logger.exception(e)
-            raise ModuleLoadError(module_name, e)
+        # The package is imported only if the index doesn't know the module.
+        entry = self.index.get(module_path) if self.index is not None else None
+        module = LoadedModule(module_name, path, entry)
+        if entry is None:
+            module.load()
+            if self.index is not None:
+                self.index.set(module_path, module.klass)
 
         if module.version != self.version:
             raise ModuleLoadError(module_name, "Module requires Weboob %s, but you use Weboob %s. Hint: use 'weboob-config update'"
                                                % (module.version, self.version))
 
         self.loaded[module_name] = module
-        self.logger.debug('Loaded module "%s" from %s' % (module_name, module.package.__path__[0]))
+        self.logger.debug('Loaded module "%s" from %s' % (module_name, path))
 
     def get_module_path(self, module_name):
         return self.path
@@ -169,8 +496,11 @@ class RepositoryModulesLoader(ModulesLoader):
     Load modules from repositories.
     """
 
+    INDEX = 'modules.index'
+
     def __init__(self, repositories):
-        super(RepositoryModulesLoader, self).__init__(repositories.modules_dir, repositories.version)
+        index = ModuleIndex(os.path.join(repositories.modules_dir, self.INDEX))
+        super(RepositoryModulesLoader, self).__init__(repositories.modules_dir, repositories.version, index)
         self.repositories = repositories
 
     def iter_existing_module_names(self):
@@ -21,10 +21,11 @@
 import os
 
 from weboob.core.bcall import BackendsCall
-from weboob.core.modules import ModulesLoader, RepositoryModulesLoader, ModuleLoadError
+from weboob.core.modules import LazyBackend, ModulesLoader, RepositoryModulesLoader, ModuleLoadError
 from weboob.core.backendscfg import BackendsConfig
 from weboob.core.repositories import Repositories, PrintProgress
 from weboob.core.scheduler import Scheduler
+from weboob.core.workers import WorkerPool
 from weboob.tools.backend import Module
 from weboob.tools.config.iconfig import ConfigError
 from weboob.tools.log import getLogger
@@ -50,10 +51,13 @@ class WebNip(object):
     :type storage: :class:`weboob.tools.storage.IStorage`
     :param scheduler: what scheduler to use; default is :class:`weboob.core.scheduler.Scheduler`
     :type scheduler: :class:`weboob.core.scheduler.IScheduler`
+    :param workers: maximum number of threads used to call backends; default is :attr:`WORKERS`
+    :type workers: :class:`int`
     """
     VERSION = '1.1'
+    WORKERS = 20
 
-    def __init__(self, modules_path=None, storage=None, scheduler=None):
+    def __init__(self, modules_path=None, storage=None, scheduler=None, workers=None):
         self.logger = getLogger('weboob')
         self.backend_instances = {}
         self.callbacks = {'login':   lambda backend_name, value: None,
@@ -71,6 +75,8 @@ class WebNip(object):
             scheduler = Scheduler()
         self.scheduler = scheduler
 
+        self.pool = WorkerPool(workers or self.WORKERS)
+
         self.storage = storage
 
     def __deinit__(self):
@@ -82,6 +88,9 @@ class WebNip(object):
         properly unload all correctly.
         """
         self.unload_backends()
+        self.pool.stop()
+        if self.storage is not None:
+            self.storage.flush()
 
     def build_backend(self, module_name, params=None, storage=None, name=None):
         """
@@ -216,8 +225,8 @@ class WebNip(object):
 
     def do(self, function, *args, **kwargs):
         r"""
-        Do calls on loaded backends with specified arguments, in separated
-        threads.
+        Do calls on loaded backends with specified arguments, in the threads
+        of the workers pool.
 
         This function has two modes:
 
@@ -233,12 +242,23 @@ class WebNip(object):
         :type backends: list[:class:`str`]
         :param caps: iterate on backends which implement this caps
         :type caps: list[:class:`weboob.capabilities.base.Capability`]
+        :param timeout: maximum duration of the whole call, in seconds
+        :type timeout: :class:`float`
+        :param per_backend_timeout: maximum duration of the call of each backend, in seconds
+        :type per_backend_timeout: :class:`float`
+        :param maxsize: maximum number of results waiting to be consumed, before
+                        backends are paused
+        :type maxsize: :class:`int`
         :rtype: A :class:`weboob.core.bcall.BackendsCall` object (iterable)
+
+        Backends which exceed a timeout are reported with a
+        :class:`weboob.core.bcall.CallTimeout` error, and results already
+        received are still returned.
         """
         backends = self.backend_instances.values()
         _backends = kwargs.pop('backends', None)
         if _backends is not None:
-            if isinstance(_backends, Module):
+            if isinstance(_backends, (Module, LazyBackend)):
                 backends = [_backends]
             elif isinstance(_backends, basestring):
                 if len(_backends) > 0:
@@ -267,7 +287,25 @@ class WebNip(object):
         # here on this object, because caller might want to use other methods, like
         # wait() on callback_thread().
         # Thanks a lot.
-        return BackendsCall(backends, function, *args, **kwargs)
+        return BackendsCall(backends, function, *args, pool=self.pool, **kwargs)
+
+    def ado(self, function, *args, **kwargs):
+        """
+        asyncio variant of :func:`do`. It takes the same arguments.
+
+        The returned object can be iterated with ``async for``, or awaited
+        to get the list of all results. Python 3.5 or later is required, and
+        the backends have to be importable by it.
+
+        When *maxsize* is given, backends are paused as long as results are
+        not consumed, so the iteration has to be stopped with ``async with``
+        or :func:`weboob.core.aiocall.AsyncBackendsCall.aclose`: see
+        :class:`weboob.core.aiocall.AsyncBackendsCall`.
+
+        :rtype: :class:`weboob.core.aiocall.AsyncBackendsCall`
+        """
+        from weboob.core.aiocall import AsyncBackendsCall
+        return AsyncBackendsCall(self.do(function, *args, **kwargs))
 
     def schedule(self, interval, function, *args):
         """
@@ -328,11 +366,13 @@ class Weboob(WebNip):
     :type backends_filename: str
     :param storage: provide a storage where backends can save data
     :type storage: :class:`weboob.tools.storage.IStorage`
+    :param workers: maximum number of threads used to call backends
+    :type workers: :class:`int`
     """
     BACKENDS_FILENAME = 'backends'
 
-    def __init__(self, workdir=None, backends_filename=None, scheduler=None, storage=None):
-        super(Weboob, self).__init__(modules_path=False, scheduler=scheduler, storage=storage)
+    def __init__(self, workdir=None, backends_filename=None, scheduler=None, storage=None, workers=None):
+        super(Weboob, self).__init__(modules_path=False, scheduler=scheduler, storage=storage, workers=workers)
 
         # Create WORKDIR
         if workdir is not None:
@@ -401,6 +441,10 @@ class Weboob(WebNip):
         """
         Load backends listed in config file.
 
+        Modules known by the index are not imported: their backends are
+        :class:`weboob.core.modules.LazyBackend` objects, which import them
+        when they are used. Configurations are checked here anyway.
+
         :param caps: load backends which implement all of specified caps
         :type caps: tuple[:class:`weboob.capabilities.base.Capability`]
         :param names: load backends with instance name in list
@@ -20,12 +20,12 @@
 
 from __future__ import print_function
 
-from threading import Event, RLock
-try:
-    from threading import _Timer as Timer
-except ImportError:
-    from threading import Timer
+import heapq
+from random import uniform
+from threading import Event, Condition, Thread
+from time import time
 
+from weboob.core.workers import WorkerPool
 from weboob.tools.log import getLogger
 from weboob.tools.misc import get_backtrace
 
@@ -50,81 +50,178 @@ class IScheduler(object):
         raise NotImplementedError()
 
 
-class RepeatedTimer(Timer):
-    def run(self):
-        while not self.finished.isSet():
-            try:
-                self.function(*self.args, **self.kwargs)
-            except Exception:
-                # do not stop timer because of an exception
-                print(get_backtrace())
-            self.finished.wait(self.interval)
-        self.finished.set()
+class Job(object):
+    def __init__(self, id, interval, function, args, repeat, jitter, misfire_grace):
+        self.id = id
+        self.interval = interval
+        self.function = function
+        self.args = args
+        self.repeat = repeat
+        self.jitter = jitter
+        self.misfire_grace = misfire_grace
+        self.due = None
+
+    def next_delay(self):
+        if self.jitter:
+            return self.interval + uniform(0, self.jitter)
+        return self.interval
 
 
 class Scheduler(IScheduler):
-    def __init__(self):
+    """
+    Scheduler which runs events with a single dispatcher thread.
+
+    Events are kept in a heap ordered by due time, and the dispatcher runs
+    due events on a pool of workers. A repeated event is never run twice at
+    the same time: its next call is planned when the previous one is over.
+
+    :param workers: maximum number of events run at the same time
+    :type workers: :class:`int`
+    :param jitter: default maximum random delay added to intervals, in seconds
+    :type jitter: :class:`float`
+    :param misfire_grace: default maximum lateness of an event; a call which
+                          starts later than that, for example because every
+                          worker is busy, is skipped (a repeated event is
+                          then planned for its next interval). If None, late
+                          events are always run.
+    :type misfire_grace: :class:`float`
+    """
+
+    def __init__(self, workers=10, jitter=0, misfire_grace=None):
         self.logger = getLogger('scheduler')
-        self.mutex = RLock()
+        self.cond = Condition()
         self.stop_event = Event()
         self.count = 0
+        # event id -> Job
         self.queue = {}
-
-    def schedule(self, interval, function, *args):
-        return self._schedule(Timer, interval, self._schedule_callback, function, *args)
-
-    def repeat(self, interval, function, *args):
-        return self._schedule(RepeatedTimer, interval, self._repeat_callback, function, *args)
-
-    def _schedule(self, klass, interval, meta_func, function, *args):
+        # (due time, event id)
+        self.heap = []
+        self.jitter = jitter
+        self.misfire_grace = misfire_grace
+        self.pool = WorkerPool(workers, name='weboob-scheduler')
+        self.dispatcher = None
+
+    def schedule(self, interval, function, *args, **kwargs):
+        """
+        Call a function after a delay.
+
+        Keyword arguments *jitter* and *misfire_grace* override the
+        scheduler's defaults for this event.
+        """
+        return self._schedule(False, interval, function, args, kwargs)
+
+    def repeat(self, interval, function, *args, **kwargs):
+        """
+        Call a function now, and then every *interval* seconds after the
+        end of the previous call.
+
+        Keyword arguments *jitter* and *misfire_grace* override the
+        scheduler's defaults for this event.
+        """
+        return self._schedule(True, interval, function, args, kwargs)
+
+    def _schedule(self, repeat, interval, function, args, kwargs):
         if self.stop_event.isSet():
             return
 
-        with self.mutex:
+        jitter = kwargs.pop('jitter', self.jitter)
+        misfire_grace = kwargs.pop('misfire_grace', self.misfire_grace)
+        if kwargs:
+            raise TypeError('Unexpected arguments: %s' % ', '.join(kwargs))
+
+        with self.cond:
             self.count += 1
-            self.logger.debug('function "%s" will be called in %s seconds' % (function.__name__, interval))
-            timer = klass(interval, meta_func, (self.count, interval, function, args))
-            self.queue[self.count] = timer
-            timer.start()
-            return self.count
-
-    def _schedule_callback(self, count, interval, function, args):
-        with self.mutex:
-            self.queue.pop(count)
-        return function(*args)
-
-    def _repeat_callback(self, count, interval, function, args):
-        function(*args)
-        with self.mutex:
-            try:
-                e = self.queue[count]
-            except KeyError:
+            job = Job(self.count, interval, function, args, repeat, jitter, misfire_grace)
+            self.queue[job.id] = job
+            self._plan(job, 0 if repeat else job.next_delay())
+
+            if self.dispatcher is None:
+                self.dispatcher = Thread(target=self._dispatch, name='weboob-scheduler')
+                self.dispatcher.daemon = True
+                self.dispatcher.start()
+            return job.id
+
+    def _plan(self, job, delay):
+        self.logger.debug('function "%s" will be called in %s seconds' % (job.function.__name__, delay))
+        job.due = time() + delay
+        heapq.heappush(self.heap, (job.due, job.id))
+        if self.heap[0][1] == job.id:
+            # the dispatcher has to wake up earlier
+            self.cond.notify()
+
+    def _dispatch(self):
+        with self.cond:
+            while not self.stop_event.isSet():
+                if not self.heap:
+                    self.cond.wait()
+                    continue
+
+                due, id = self.heap[0]
+                now = time()
+                if due > now:
+                    self.cond.wait(due - now)
+                    continue
+
+                heapq.heappop(self.heap)
+                job = self.queue.get(id)
+                if job is None or job.due != due:
+                    # cancelled
+                    continue
+
+                self.pool.submit(job.id, self._run, job)
+
+    def _run(self, job):
+        # The job may have waited for a worker, so it is checked when it
+        # starts, not when it is dispatched.
+        with self.cond:
+            if self.queue.get(job.id) is not job:
+                # cancelled while it was waiting for a worker
+                return
+
+            late = time() - job.due
+            if job.misfire_grace is not None and late > job.misfire_grace:
+                self.logger.debug('function "%s" is late by %.1f seconds, skipped' % (job.function.__name__, late))
+                self._finished(job)
                 return
-            else:
-                self.logger.debug('function "%s" will be called in %s seconds' % (function.__name__, e.interval))
+
+        try:
+            job.function(*job.args)
+        except Exception:
+            # do not stop scheduler because of an exception
+            print(get_backtrace())
+        finally:
+            with self.cond:
+                self._finished(job)
+
+    def _finished(self, job):
+        if self.queue.get(job.id) is not job:
+            # cancelled while running
+            return
+
+        if job.repeat and not self.stop_event.isSet():
+            self._plan(job, job.next_delay())
+        else:
+            self.queue.pop(job.id)
 
     def cancel(self, ev):
-        with self.mutex:
+        with self.cond:
             try:
-                e = self.queue.pop(ev)
+                job = self.queue.pop(ev)
             except KeyError:
                 return False
-            e.cancel()
-            self.logger.debug('scheduled function "%s" is canceled' % e.function.__name__)
+            # the heap entry is ignored by the dispatcher
+            self.logger.debug('scheduled function "%s" is canceled' % job.function.__name__)
             return True
 
     def _wait_to_stop(self):
         self.want_stop()
-        with self.mutex:
-            for e in self.queue.itervalues():
-                e.cancel()
-                e.join()
-            self.queue = {}
+        self.pool.stop(wait=True)
 
     def run(self):
         try:
-            while True:
-                self.stop_event.wait(0.1)
+            while not self.stop_event.isSet():
+                # With a timeout, so ^C can interrupt it on Python 2.
+                self.stop_event.wait(1)
         except KeyboardInterrupt:
             self._wait_to_stop()
             raise
@@ -134,9 +231,9 @@ class Scheduler(IScheduler):
 
     def want_stop(self):
         self.stop_event.set()
-        with self.mutex:
-            for t in self.queue.itervalues():
-                t.cancel()
-                # Contrary to _wait_to_stop(), don't call t.join
-                # because want_stop() have to be non-blocking.
+        with self.cond:
             self.queue = {}
+            self.heap = []
+            # Do not wait for running events, because want_stop() has to be
+            # non-blocking.
+            self.cond.notify_all()
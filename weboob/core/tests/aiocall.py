@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+import gc
+import sys
+from textwrap import dedent
+from unittest import TestCase, skipIf
+
+from weboob.core.bcall import CallErrors, CallTimeout
+from weboob.core.ouiboube import WebNip
+from weboob.core.tests.bcall import MockBackend
+
+if sys.version_info >= (3, 5):
+    import asyncio
+
+
+def compile_coroutines(source):
+    """
+    Compile coroutines of a test.
+
+    The async/await syntax is a syntax error for Python 2, which
+    byte-compiles this module too.
+    """
+    namespace = {'asyncio': sys.modules.get('asyncio'), 'CallErrors': CallErrors}
+    exec(dedent(source), namespace)
+    return namespace
+
+
+@skipIf(sys.version_info < (3, 5), 'asyncio requires Python 3.5')
+class AsyncBackendsCallTest(TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.weboob = WebNip(modules_path='', workers=5)
+
+    def tearDown(self):
+        self.weboob.pool.stop(wait=True)
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def run_async(self, coroutine, timeout=5):
+        return self.loop.run_until_complete(asyncio.wait_for(coroutine, timeout))
+
+    def set_backends(self, *backends):
+        self.weboob.backend_instances = dict((backend.name, backend) for backend in backends)
+
+    def test_async_for(self):
+        self.set_backends(MockBackend('a', [1, 2]), MockBackend('b', [3], delay=0.1))
+        ns = compile_coroutines("""
+            async def collect(call):
+                return [value async for value in call]
+        """)
+        results = self.run_async(ns['collect'](self.weboob.ado('iter_values', factor=10)))
+        self.assertEqual(sorted(results), [10, 20, 30])
+
+    def test_await(self):
+        self.set_backends(MockBackend('a', [1, 2]), MockBackend('b', [3], delay=0.1))
+        ns = compile_coroutines("""
+            async def collect(weboob):
+                return await weboob.ado('iter_values')
+        """)
+        self.assertEqual(sorted(self.run_async(ns['collect'](self.weboob))), [1, 2, 3])
+
+    def test_errors(self):
+        error = ValueError('boom')
+        self.set_backends(MockBackend('a', [1, 2], error=error), MockBackend('b', [3]))
+        ns = compile_coroutines("""
+            async def collect(call, results):
+                async for value in call:
+                    results.append(value)
+        """)
+        results = []
+        with self.assertRaises(CallErrors) as cm:
+            self.run_async(ns['collect'](self.weboob.ado('iter_values'), results))
+        self.assertEqual(sorted(results), [1, 2, 3])
+        self.assertEqual([e for _, e, _ in cm.exception], [error])
+
+        with self.assertRaises(CallErrors):
+            self.run_async(self.weboob.ado('iter_values').gather())
+
+    def test_timeout(self):
+        backends = [MockBackend('fast', [1]), MockBackend('slow', [2, 3, 4], delay=0.2)]
+        self.set_backends(*backends)
+        ns = compile_coroutines("""
+            async def collect(call, results):
+                async for value in call:
+                    results.append(value)
+        """)
+        results = []
+        with self.assertRaises(CallErrors) as cm:
+            self.run_async(ns['collect'](self.weboob.ado('iter_values', per_backend_timeout=0.3), results))
+        self.assertEqual(sorted(results), [1, 2])
+        errors = list(cm.exception)
+        self.assertEqual(len(errors), 1)
+        self.assertIs(errors[0][0], backends[1])
+        self.assertIsInstance(errors[0][1], CallTimeout)
+
+    def test_task_cancel(self):
+        backend = MockBackend('slow', range(100), delay=0.05)
+        self.set_backends(backend)
+        ns = compile_coroutines("""
+            async def collect(call, results):
+                async for value in call:
+                    results.append(value)
+
+            async def cancel(task):
+                await asyncio.sleep(0.2)
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    return True
+                return False
+        """)
+        results = []
+        task = self.loop.create_task(ns['collect'](self.weboob.ado('iter_values'), results))
+        self.assertTrue(self.run_async(ns['cancel'](task)))
+        # the generator of the backend is closed too
+        self.assertTrue(backend.closed.wait(5))
+        self.assertLess(len(results), 100)
+
+        backend.closed.clear()
+        self.assertTrue(self.run_async(ns['cancel'](self.weboob.ado('iter_values').gather())))
+        self.assertTrue(backend.closed.wait(5))
+
+    def test_async_with(self):
+        backend = MockBackend('a', range(10))
+        self.set_backends(backend)
+        ns = compile_coroutines("""
+            async def first(weboob):
+                async with weboob.ado('iter_values', maxsize=2) as call:
+                    async for value in call:
+                        return value
+        """)
+        self.assertEqual(self.run_async(ns['first'](self.weboob)), 0)
+        self.assertTrue(backend.closed.wait(5))
+        self.assertEqual(sorted(self.run_async(self.weboob.ado('iter_values').gather())), list(range(10)))
+
+    def test_break(self):
+        backend = MockBackend('a', range(10))
+        self.set_backends(backend)
+        ns = compile_coroutines("""
+            async def first(weboob):
+                async for value in weboob.ado('iter_values', maxsize=2):
+                    break
+                return value
+        """)
+        self.assertEqual(self.run_async(ns['first'](self.weboob)), 0)
+        gc.collect()
+        # the call is cancelled when it is collected, and the backend is
+        # free for next calls
+        self.assertTrue(backend.closed.wait(5))
+        self.assertEqual(sorted(self.run_async(self.weboob.ado('iter_values').gather())), list(range(10)))
+
+    def test_nested(self):
+        # without maxsize, a call on a backend can be nested in the
+        # iteration on another call on it
+        self.set_backends(MockBackend('a', range(150)))
+        ns = compile_coroutines("""
+            async def nested(weboob):
+                results = []
+                async for value in weboob.ado('iter_values'):
+                    if value == 0:
+                        results = await weboob.ado('iter_values')
+                return results
+        """)
+        self.assertEqual(len(self.run_async(ns['nested'](self.weboob))), 150)
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from threading import Event, Lock
+from time import sleep
+from unittest import TestCase
+
+from weboob.core.bcall import BackendsCall, CallErrors, CallTimeout
+from weboob.core.workers import WorkerPool
+
+
+class MockBackend(object):
+    def __init__(self, name, values, delay=0, error=None):
+        self.name = name
+        self.values = values
+        self.delay = delay
+        self.error = error
+        self.lock = Lock()
+        self.closed = Event()
+
+    def __enter__(self):
+        self.lock.acquire()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.lock.release()
+
+    def __repr__(self):
+        return '<MockBackend %r>' % self.name
+
+    def iter_values(self, factor=None):
+        try:
+            for value in self.values:
+                sleep(self.delay)
+                yield value if factor is None else value * factor
+            if self.error is not None:
+                raise self.error
+        finally:
+            self.closed.set()
+
+
+class PoolTestCase(TestCase):
+    def setUp(self):
+        self.pool = WorkerPool(5)
+
+    def tearDown(self):
+        self.pool.stop(wait=True)
+
+    def call(self, backends, *args, **kwargs):
+        return BackendsCall(backends, 'iter_values', *args, pool=self.pool, **kwargs)
+
+
+class BackendsCallTest(PoolTestCase):
+
+    def test_arguments(self):
+        backends = [MockBackend('a', [1, 2]), MockBackend('b', [3])]
+        self.assertEqual(sorted(self.call(backends, 10)), [10, 20, 30])
+        self.assertEqual(sorted(self.call(backends, factor=2)), [2, 4, 6])
+        # without pool, one thread per backend
+        self.assertEqual(sorted(BackendsCall(backends, 'iter_values')), [1, 2, 3])
+
+    def test_errors(self):
+        error = ValueError('boom')
+        backends = [MockBackend('a', [1, 2], error=error), MockBackend('b', [3])]
+        results = []
+        try:
+            for value in self.call(backends):
+                results.append(value)
+        except CallErrors as errors:
+            self.assertEqual([(backend.name, e) for backend, e, _ in errors], [('a', error)])
+        else:
+            self.fail('CallErrors not raised')
+        self.assertEqual(sorted(results), [1, 2, 3])
+
+    def test_timeout(self):
+        backends = [MockBackend('fast', [1]), MockBackend('slow', [2, 3, 4], delay=0.2)]
+        call = self.call(backends, per_backend_timeout=0.3)
+        results = []
+        with self.assertRaises(CallErrors) as cm:
+            for value in call:
+                results.append(value)
+        self.assertEqual(results, [1, 2])
+        errors = list(cm.exception)
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0][1], CallTimeout)
+        self.assertIs(errors[0][0], backends[1])
+
+    def test_early_stop(self):
+        backend = MockBackend('slow', range(100), delay=0.01)
+        iterator = iter(self.call([backend]))
+        self.assertEqual(next(iterator), 0)
+        iterator.close()
+        # the generator of the backend is closed too
+        self.assertTrue(backend.closed.wait(5))
+
+
+    def test_wait_backend(self):
+        backends = [MockBackend('fast', [1]), MockBackend('slow', [2], delay=0.3)]
+        call = self.call(backends)
+        self.assertTrue(call.wait_backend('fast', 5))
+        self.assertFalse(call.wait_backend(backends[1], 0))
+        self.assertTrue(call.wait_backend(backends[1], 5))
+        self.assertEqual(sorted(call), [1, 2])
+
+    def test_iter_by_backend(self):
+        backends = [MockBackend('fast', [1, 2]), MockBackend('slow', [3], delay=0.3)]
+        call = self.call(backends)
+        iterator = call.iter_by_backend()
+        backend, results = next(iterator)
+        self.assertIs(backend, backends[0])
+        self.assertEqual(results, [1, 2])
+        # the slow backend is still running
+        self.assertFalse(call.wait_backend('slow', 0))
+
+        backend, results = next(iterator)
+        self.assertIs(backend, backends[1])
+        self.assertEqual(results, [3])
+        self.assertEqual(list(iterator), [])
+
+    def test_callback_thread(self):
+        error = ValueError('boom')
+        backends = [MockBackend('a', [1, 2], error=error), MockBackend('b', [3], delay=0.1)]
+        results = []
+        errors = []
+        finished = Event()
+        thread = self.call(backends).callback_thread(results.append,
+                                                     lambda backend, e, backtrace: errors.append((backend, e)),
+                                                     finished.set)
+        thread.join(5)
+        self.assertTrue(finished.is_set())
+        self.assertEqual(sorted(results), [1, 2, 3])
+        self.assertEqual(errors, [(backends[0], error)])
+
+
+class BackpressureTest(PoolTestCase):
+    def test_pause(self):
+        backend = MockBackend('a', range(10))
+        call = self.call([backend], maxsize=2)
+        sleep(0.2)
+        # the producer is paused until the consumer catches up
+        self.assertEqual(len(call.responses), 2)
+        self.assertFalse(backend.closed.is_set())
+
+        iterator = iter(call)
+        self.assertEqual(next(iterator), 0)
+        sleep(0.2)
+        self.assertEqual(len(call.responses), 2)
+        self.assertEqual(list(iterator), list(range(1, 10)))
+        self.assertTrue(backend.closed.is_set())
+
+    def test_cancel(self):
+        backend = MockBackend('a', range(10))
+        call = self.call([backend], maxsize=2)
+        sleep(0.2)
+        self.assertFalse(backend.closed.is_set())
+
+        call.cancel()
+        self.assertTrue(backend.closed.wait(5))
+        # results received before the cancel can still be read
+        self.assertEqual(list(call), [0, 1])
+        # the backend is free for next calls
+        self.assertEqual(list(self.call([backend])), list(range(10)))
+
+    def test_timeout(self):
+        backend = MockBackend('a', range(10))
+        call = self.call([backend], maxsize=2, timeout=0.2)
+        self.assertTrue(backend.closed.wait(5))
+
+        with self.assertRaises(CallErrors) as cm:
+            list(call)
+        errors = list(cm.exception)
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0][1], CallTimeout)
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import sys
+import tempfile
+from unittest import TestCase
+
+from weboob.capabilities.bank import CapBank
+from weboob.capabilities.collection import CapCollection
+from weboob.capabilities.messages import CapMessages
+from weboob.core.modules import LazyBackend, LoadedModule, ModuleIndex, ModulesLoader, get_tree_mtime
+from weboob.core.ouiboube import WebNip
+from weboob.tools.backend import Module
+from weboob.tools.value import ValueBackendPassword
+
+
+NAME = 'indexedbank'
+
+MODULE = """from weboob.capabilities.bank import CapBank
+from weboob.tools.backend import Module, BackendConfig
+from weboob.tools.value import Value, ValueBackendPassword
+
+
+class IndexedBankModule(Module, CapBank):
+    NAME = 'indexedbank'
+    MAINTAINER = u'John Doe'
+    EMAIL = 'john@example.org'
+    VERSION = '%s'
+    DESCRIPTION = u'Indexed bank'
+    LICENSE = 'AGPLv3+'
+    CONFIG = BackendConfig(Value('login', label='Login', regexp=r'^\\d+$'),
+                           Value('website', label='Website', choices={'par': 'Particuliers', 'pro': 'Professionnels'},
+                                 default='par'),
+                           ValueBackendPassword('password', label='Password'))
+
+    def iter_accounts(self):
+        return [self.config['password'].get()]
+"""
+
+
+class IndexTestCase(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='weboob-modules-')
+        self.module_path = os.path.join(self.tmpdir, NAME)
+        os.makedirs(self.module_path)
+        with open(os.path.join(self.module_path, '__init__.py'), 'w') as f:
+            f.write('from .module import IndexedBankModule\n')
+        with open(os.path.join(self.module_path, 'module.py'), 'w') as f:
+            f.write(MODULE % Module.VERSION)
+        self.index_path = os.path.join(self.tmpdir, 'modules.index')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        self.forget_module()
+
+    def forget_module(self):
+        for name in list(sys.modules):
+            if name == NAME or name.startswith(NAME + '.'):
+                del sys.modules[name]
+
+    def build_index(self):
+        module = LoadedModule(NAME, self.tmpdir)
+        index = ModuleIndex(self.index_path)
+        index.set(self.module_path, module.klass)
+        return index, module
+
+
+class ModuleIndexTest(IndexTestCase):
+    def test_entry(self):
+        index, module = self.build_index()
+        entry = ModuleIndex(self.index_path).get(self.module_path)
+        self.assertEqual(entry['name'], 'indexedbank')
+        self.assertEqual(entry['caps'], ['CapBank', 'CapCollection'])
+
+        indexed = LoadedModule(NAME, self.tmpdir, entry)
+        self.assertEqual(indexed.name, module.name)
+        self.assertEqual(indexed.maintainer, module.maintainer)
+        self.assertEqual(indexed.version, module.version)
+        self.assertEqual(indexed.description, module.description)
+        self.assertEqual(indexed.license, module.license)
+        self.assertFalse(indexed.is_loaded)
+
+    def test_changed_module(self):
+        index, module = self.build_index()
+        self.assertIsNotNone(index.get(self.module_path))
+
+        mtime = get_tree_mtime(self.module_path) + 10
+        os.utime(os.path.join(self.module_path, 'module.py'), (mtime, mtime))
+        self.assertIsNone(index.get(self.module_path))
+        self.assertIsNone(ModuleIndex(self.index_path).get(self.module_path))
+
+        # compiled files are not sources of the module
+        index.set(self.module_path, module.klass)
+        mtime += 10
+        with open(os.path.join(self.module_path, 'module.pyc'), 'w') as f:
+            f.write('')
+        os.utime(os.path.join(self.module_path, 'module.pyc'), (mtime, mtime))
+        self.assertIsNotNone(index.get(self.module_path))
+
+    def test_corrupt_index(self):
+        with open(self.index_path, 'wb') as f:
+            f.write(b'\x80\x02}q\x01(U\x0bnot an index')
+        index = ModuleIndex(self.index_path)
+        self.assertEqual(index.entries, {})
+        self.assertIsNone(index.get(self.module_path))
+
+        # the module is imported, and the index is written again
+        loader = ModulesLoader(self.tmpdir, Module.VERSION, index)
+        module = loader.get_or_load_module(NAME)
+        self.assertTrue(module.is_loaded)
+        self.assertIsNotNone(ModuleIndex(self.index_path).get(self.module_path))
+
+    def test_loader_uses_index(self):
+        self.build_index()
+        loader = ModulesLoader(self.tmpdir, Module.VERSION, ModuleIndex(self.index_path))
+        module = loader.get_or_load_module(NAME)
+        self.assertFalse(module.is_loaded)
+        self.assertEqual(module.klass.__name__, 'IndexedBankModule')
+        self.assertTrue(module.is_loaded)
+
+    def test_has_caps(self):
+        index, module = self.build_index()
+        indexed = LoadedModule(NAME, self.tmpdir, index.get(self.module_path))
+
+        for m in (indexed, module):
+            self.assertTrue(m.has_caps(CapBank))
+            self.assertTrue(m.has_caps('CapBank'))
+            self.assertTrue(m.has_caps(CapMessages, 'CapBank'))
+            self.assertTrue(m.has_caps(CapCollection))
+            self.assertTrue(m.has_caps('CapCollection'))
+            self.assertFalse(m.has_caps(CapMessages))
+            self.assertFalse(m.has_caps('CapMessages'))
+        self.assertFalse(indexed.is_loaded)
+
+    def test_config(self):
+        index, module = self.build_index()
+        indexed = LoadedModule(NAME, self.tmpdir, index.get(self.module_path))
+        config = indexed.config
+        self.assertFalse(indexed.is_loaded)
+
+        self.assertIsNot(config, module.klass.CONFIG)
+        self.assertIsInstance(config, type(module.klass.CONFIG))
+        self.assertEqual(list(config.keys()), ['login', 'website', 'password'])
+        for key, value in module.klass.CONFIG.items():
+            self.assertIsInstance(config[key], type(value))
+            self.assertEqual(config[key].label, value.label)
+            self.assertEqual(config[key].default, value.default)
+            self.assertEqual(config[key].masked, value.masked)
+            self.assertEqual(config[key].choices, value.choices)
+
+        self.assertIsInstance(config['password'], ValueBackendPassword)
+        self.assertTrue(config['password'].masked)
+        config['login'].check_valid('1234')
+        self.assertRaises(ValueError, config['login'].check_valid, 'john')
+
+    def test_unpicklable_config(self):
+        index, module = self.build_index()
+        entry = index.get(self.module_path)
+        entry['config'] = b'not a pickle'
+        indexed = LoadedModule(NAME, self.tmpdir, entry)
+        self.assertEqual(list(indexed.config.keys()), ['login', 'website', 'password'])
+        self.assertTrue(indexed.is_loaded)
+
+
+class LazyBackendTest(IndexTestCase):
+    def setUp(self):
+        super(LazyBackendTest, self).setUp()
+        self.build_index()
+        self.forget_module()
+        self.weboob = WebNip(modules_path='', workers=2)
+        self.weboob.modules_loader = ModulesLoader(self.tmpdir, Module.VERSION, ModuleIndex(self.index_path))
+
+    def tearDown(self):
+        self.weboob.deinit()
+        super(LazyBackendTest, self).tearDown()
+
+    def is_imported(self):
+        return self.weboob.modules_loader.get_or_load_module(NAME).is_loaded
+
+    def test_lazy(self):
+        backend = self.weboob.load_backend(NAME, 'bank', {'login': '1234', 'password': 'secret'})
+        self.assertIsInstance(backend, LazyBackend)
+        self.assertEqual(backend.name, 'bank')
+        self.assertEqual(backend.NAME, NAME)
+        self.assertEqual(backend.DESCRIPTION, u'Indexed bank')
+        self.assertTrue(backend.has_caps(CapBank))
+        self.assertTrue(backend.has_caps((CapMessages, 'CapBank')))
+        self.assertFalse(backend.has_caps(CapMessages))
+        self.assertEqual(list(self.weboob.iter_backends(caps=CapBank)), [backend])
+        self.assertFalse(self.is_imported())
+        self.assertNotIn(NAME, sys.modules)
+
+        # the module is imported when the backend is used
+        self.assertEqual(list(self.weboob.do('iter_accounts', backends=backend)), [u'secret'])
+        self.assertTrue(self.is_imported())
+        self.assertTrue(backend.is_created)
+        self.assertEqual(type(backend.get_backend()).__name__, 'IndexedBankModule')
+        self.assertEqual(backend.config['login'].get(), u'1234')
+        self.assertIs(backend.get_backend().lock, backend.lock)
+        self.assertEqual(self.weboob.unload_backends(), {'bank': backend})
+
+    def test_config_error(self):
+        self.assertRaises(Module.ConfigError, self.weboob.load_backend, NAME, 'bank', {'password': 'secret'})
+        self.assertRaises(Module.ConfigError, self.weboob.load_backend, NAME, 'bank',
+                          {'login': 'john', 'password': 'secret'})
+        self.assertRaises(Module.ConfigError, self.weboob.load_backend, NAME, 'bank',
+                          {'login': '1234', 'website': 'foo', 'password': 'secret'})
+        self.assertFalse(self.is_imported())
+
+    def test_password_command(self):
+        calls = os.path.join(self.tmpdir, 'calls')
+        backend = self.weboob.load_backend(NAME, 'bank', {'login': '1234',
+                                                          'password': '`echo called >> %s; echo secret`' % calls})
+        self.assertEqual(list(self.weboob.do('iter_accounts')), [u'secret'])
+        # the external tool is called once, to check the configuration
+        with open(calls) as f:
+            self.assertEqual(f.read(), 'called\n')
+        self.assertTrue(backend.is_created)
+
+    def test_unload(self):
+        self.weboob.load_backend(NAME, 'bank', {'login': '1234', 'password': 'secret'})
+        self.weboob.unload_backends()
+        self.assertFalse(self.is_imported())
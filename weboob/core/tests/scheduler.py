@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from threading import Event, Lock, Thread
+from time import sleep, time
+from unittest import TestCase
+
+from weboob.core.scheduler import Job, Scheduler
+
+
+class Recorder(object):
+    """
+    Function to schedule, which records its calls.
+    """
+
+    def __init__(self, duration=0):
+        self.duration = duration
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+        self.lock = Lock()
+        self.called = Event()
+
+    def __call__(self, *args):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        start = time()
+        sleep(self.duration)
+        with self.lock:
+            self.running -= 1
+            self.calls.append((start, time(), args))
+        self.called.set()
+
+    @property
+    def __name__(self):
+        return 'recorder'
+
+    def wait(self, count, timeout=5):
+        end = time() + timeout
+        while len(self.calls) < count and time() < end:
+            sleep(0.01)
+        return len(self.calls) >= count
+
+
+class SchedulerTest(TestCase):
+    def setUp(self):
+        self.start = time()
+
+    def tearDown(self):
+        self.scheduler.want_stop()
+        self.scheduler.pool.stop(wait=True)
+
+    def test_due_order(self):
+        self.scheduler = Scheduler()
+        order = []
+        for delay, name in ((0.3, 'c'), (0.1, 'a'), (0.2, 'b')):
+            self.scheduler.schedule(delay, order.append, name)
+        recorder = Recorder()
+        self.scheduler.schedule(0.35, recorder, 'args', 42)
+
+        self.assertTrue(recorder.wait(1))
+        self.assertEqual(order, ['a', 'b', 'c'])
+        start, end, args = recorder.calls[0]
+        self.assertGreaterEqual(start - self.start, 0.35)
+        self.assertEqual(args, ('args', 42))
+        # the event is forgotten once called
+        self.assertEqual(self.scheduler.queue, {})
+
+    def test_repeat(self):
+        self.scheduler = Scheduler()
+        recorder = Recorder(duration=0.1)
+        ev = self.scheduler.repeat(0.05, recorder)
+        self.assertTrue(recorder.wait(3))
+        self.assertTrue(self.scheduler.cancel(ev))
+
+        # the first call is immediate
+        self.assertLess(recorder.calls[0][0] - self.start, 0.05)
+        # the next ones start an interval after the end of the previous one
+        for previous, call in zip(recorder.calls, recorder.calls[1:]):
+            self.assertGreaterEqual(call[0] - previous[1], 0.05)
+        self.assertEqual(recorder.max_running, 1)
+
+    def test_cancel_pending(self):
+        self.scheduler = Scheduler()
+        recorder = Recorder()
+        ev = self.scheduler.schedule(0.1, recorder)
+        self.assertTrue(self.scheduler.cancel(ev))
+        self.assertFalse(self.scheduler.cancel(ev))
+        self.assertFalse(recorder.called.wait(0.3))
+
+    def test_cancel_running(self):
+        self.scheduler = Scheduler()
+        recorder = Recorder(duration=0.2)
+        ev = self.scheduler.repeat(0.01, recorder)
+        sleep(0.1)
+        self.assertEqual(recorder.running, 1)
+        self.assertTrue(self.scheduler.cancel(ev))
+
+        # the running call ends, and the event is not planned again
+        self.assertTrue(recorder.called.wait(1))
+        sleep(0.2)
+        self.assertEqual(len(recorder.calls), 1)
+        self.assertFalse(self.scheduler.cancel(ev))
+
+    def test_cancel_waiting_for_worker(self):
+        self.scheduler = Scheduler(workers=1)
+        busy = Recorder(duration=0.3)
+        self.scheduler.schedule(0, busy)
+        recorder = Recorder()
+        ev = self.scheduler.schedule(0.05, recorder)
+        sleep(0.15)
+        # the event is dispatched, but every worker is busy
+        self.assertTrue(self.scheduler.cancel(ev))
+        self.assertTrue(busy.wait(1))
+        self.assertFalse(recorder.called.wait(0.2))
+
+    def test_jitter(self):
+        job = Job(1, 10, None, (), False, 2, None)
+        delays = [job.next_delay() for _ in range(1000)]
+        self.assertGreaterEqual(min(delays), 10)
+        self.assertLessEqual(max(delays), 12)
+        self.assertNotEqual(min(delays), max(delays))
+        self.assertEqual(Job(1, 10, None, (), False, 0, None).next_delay(), 10)
+
+        self.scheduler = Scheduler(jitter=0.1)
+        recorder = Recorder()
+        self.scheduler.schedule(0.05, recorder)
+        # the default jitter can be overridden
+        exact = Recorder()
+        self.scheduler.schedule(0.05, exact, jitter=0)
+        self.assertTrue(recorder.wait(1))
+        self.assertTrue(exact.wait(1))
+        self.assertGreaterEqual(recorder.calls[0][0] - self.start, 0.05)
+        self.assertLess(recorder.calls[0][0] - self.start, 0.15 + 0.05)
+        self.assertLess(exact.calls[0][0] - self.start, 0.05 + 0.05)
+
+        self.assertRaises(TypeError, self.scheduler.schedule, 1, exact, foo=1)
+
+    def test_misfire(self):
+        self.scheduler = Scheduler(workers=1, misfire_grace=0.05)
+        busy = Recorder(duration=0.3)
+        self.scheduler.schedule(0, busy)
+        sleep(0.05)
+
+        # queued behind the busy call, and late when a worker is free
+        late = Recorder()
+        self.scheduler.schedule(0.01, late)
+        # the default grace can be overridden
+        tolerant = Recorder()
+        self.scheduler.schedule(0.01, tolerant, misfire_grace=None)
+        # a late repeated event is planned for its next interval
+        repeated = Recorder()
+        ev = self.scheduler.repeat(0.1, repeated)
+
+        self.assertTrue(repeated.wait(1))
+        self.assertTrue(tolerant.wait(1))
+        self.assertFalse(late.called.is_set())
+        self.assertGreaterEqual(repeated.calls[0][0] - self.start, 0.3 + 0.1)
+        self.assertTrue(self.scheduler.cancel(ev))
+
+    def test_want_stop(self):
+        self.scheduler = Scheduler()
+        recorder = Recorder()
+        self.scheduler.schedule(0.2, recorder)
+        returned = []
+        thread = Thread(target=lambda: returned.append(self.scheduler.run()))
+        thread.start()
+        sleep(0.05)
+        self.assertTrue(thread.is_alive())
+
+        self.scheduler.want_stop()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(returned, [True])
+        # pending events are dropped, and new ones are refused
+        self.assertIsNone(self.scheduler.schedule(0, recorder))
+        self.assertFalse(recorder.called.wait(0.3))
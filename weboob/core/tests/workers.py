@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from threading import Event, Lock
+from time import sleep
+from unittest import TestCase
+
+from weboob.core.workers import WorkerPool
+
+
+class WorkerPoolTest(TestCase):
+    def setUp(self):
+        self.pool = WorkerPool(size=1, name='weboob-test')
+        self.done = []
+        # keeps the only worker busy until jobs are queued
+        self.release = Event()
+        self.pool.submit('blocker', self.release.wait)
+
+    def tearDown(self):
+        self.release.set()
+        self.pool.stop(wait=True)
+
+    def job(self, name):
+        self.done.append(name)
+
+    def test_round_robin_between_keys(self):
+        for key in ('a', 'b'):
+            for i in range(3):
+                self.pool.submit(key, self.job, '%s%d' % (key, i))
+
+        self.release.set()
+        self.pool.stop(wait=True)
+        self.assertEqual(self.done, ['a0', 'b0', 'a1', 'b1', 'a2', 'b2'])
+
+    def test_same_key_is_sequential(self):
+        pool = WorkerPool(size=4)
+        lock = Lock()
+        running = []
+        concurrency = []
+
+        def job():
+            with lock:
+                running.append(None)
+                concurrency.append(len(running))
+            sleep(0.01)
+            with lock:
+                running.pop()
+
+        for i in range(5):
+            pool.submit('backend', job)
+        pool.stop(wait=True)
+
+        self.assertEqual(concurrency, [1] * 5)
+
+    def test_exception_does_not_stop_worker(self):
+        errors = []
+        self.pool.logger.error = lambda *args: errors.append(args)
+
+        def fail():
+            raise ValueError('boom')
+
+        self.pool.submit('a', fail)
+        self.pool.submit('a', self.job, 'after')
+        self.release.set()
+        self.pool.stop(wait=True)
+
+        self.assertEqual(len(errors), 1)
+        self.assertIn('boom', errors[0][-1])
+        self.assertEqual(self.done, ['after'])
+
+    def test_stop_runs_queued_jobs(self):
+        for i in range(3):
+            self.pool.submit('a', self.job, i)
+
+        self.pool.stop()
+        self.assertRaises(RuntimeError, self.pool.submit, 'a', self.job, 3)
+        self.assertEqual(self.done, [])
+
+        self.release.set()
+        self.pool.stop(wait=True)
+        self.assertEqual(self.done, [0, 1, 2])
+        self.assertEqual(self.pool.threads, [])
+
+    def test_submit_from_worker(self):
+        # a job which waits for another job of the pool must not deadlock,
+        # even if every worker is busy
+        inner = Event()
+
+        def outer():
+            self.pool.submit('b', inner.set)
+            inner.wait(5)
+            self.done.append(inner.is_set())
+
+        self.release.set()
+        self.pool.submit('a', outer)
+        self.pool.stop(wait=True)
+        self.assertEqual(self.done, [True])
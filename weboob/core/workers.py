@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+
+from collections import deque
+from threading import Thread, Condition, current_thread, local
+
+from weboob.tools.log import getLogger
+from weboob.tools.misc import get_backtrace
+
+
+__all__ = ['WorkerPool']
+
+
+class WorkerPool(object):
+    """
+    Pool of reusable threads on which jobs are run.
+
+    Jobs are submitted with a key (usually a backend). Workers pick jobs in a
+    round-robin order between keys, and never run two jobs with the same key
+    at the same time, so a backend with a lot of pending jobs can't starve the
+    other ones (and workers do not wait on the lock of a busy backend).
+
+    Threads are started on demand, up to *size*.
+
+    :param size: maximum number of threads
+    :type size: :class:`int`
+    :param name: prefix of threads names
+    :type name: :class:`str`
+    """
+
+    def __init__(self, size=20, name='weboob-worker'):
+        assert size > 0
+        self.logger = getLogger('workers')
+        self.size = size
+        self.name = name
+        self.cond = Condition()
+        self.threads = []
+        self.idle = 0
+        self.stopped = False
+
+        # key -> deque of pending jobs
+        self.jobs = {}
+        # keys which have pending jobs but no running one
+        self.ready = deque()
+        # keys which have a running job
+        self.running = set()
+
+        self._local = local()
+
+    def submit(self, key, function, *args, **kwargs):
+        """
+        Run a function in the pool.
+
+        :param key: jobs with the same key are run sequentially
+        :type key: hashable object
+        :param function: function to call
+        :type function: callable
+        """
+        if getattr(self._local, 'pool', None) is self:
+            # Submitted from one of our workers, which may wait for this job
+            # to finish: if every worker does the same, they would all be
+            # stuck. So run it in a dedicated thread.
+            thread = Thread(target=self._run, args=(function, args, kwargs))
+            thread.daemon = True
+            thread.start()
+            return
+
+        with self.cond:
+            if self.stopped:
+                raise RuntimeError('Unable to submit a job on a stopped pool')
+
+            jobs = self.jobs.setdefault(key, deque())
+            jobs.append((function, args, kwargs))
+            if len(jobs) == 1 and key not in self.running:
+                self.ready.append(key)
+
+            if self.idle > 0:
+                self.idle -= 1
+                self.cond.notify()
+            elif len(self.threads) < self.size:
+                thread = Thread(target=self._worker, name='%s-%d' % (self.name, len(self.threads) + 1))
+                thread.daemon = True
+                self.threads.append(thread)
+                thread.start()
+
+    def stop(self, wait=False):
+        """
+        Stop the pool. Pending jobs are still run, but no new one is accepted.
+
+        :param wait: if True, wait for all workers to be finished
+        :type wait: :class:`bool`
+        """
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+            threads = list(self.threads)
+
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def _run(self, function, args, kwargs):
+        try:
+            function(*args, **kwargs)
+        except Exception as e:
+            self.logger.error('Uncaught exception in job %r: %s', function, get_backtrace(e))
+
+    def _worker(self):
+        self._local.pool = self
+        while True:
+            with self.cond:
+                while not self.ready and not self.stopped:
+                    # the counter is decremented by the thread which wakes us up
+                    self.idle += 1
+                    self.cond.wait()
+
+                if not self.ready:
+                    self.threads.remove(current_thread())
+                    return
+
+                key = self.ready.popleft()
+                function, args, kwargs = self.jobs[key].popleft()
+                self.running.add(key)
+
+            try:
+                self._run(function, args, kwargs)
+            finally:
+                with self.cond:
+                    self.running.discard(key)
+                    if self.jobs[key]:
+                        # go back at the end of the line
+                        self.ready.append(key)
+                    else:
+                        del self.jobs[key]
@@ -284,21 +284,28 @@ class Application(object):
     def _do_complete_iter(self, backend, count, fields, res):
         modif = 0
 
-        for i, sub in enumerate(res):
-            sub = self._do_complete_obj(backend, fields, sub)
-            if self.condition and self.condition.limit and \
-               self.condition.limit == i:
-                return
-
-            if self.condition and not self.condition.is_valid(sub):
-                modif += 1
-            else:
-                if count and i - modif == count:
-                    if self._is_default_count:
+        try:
+            for i, sub in enumerate(res):
+                if self.condition and self.condition.limit and \
+                   self.condition.limit == i:
+                    return
+
+                sub = self._do_complete_obj(backend, fields, sub)
+                if self.condition and not self.condition.is_valid(sub):
+                    modif += 1
+                else:
+                    if count and i - modif == count:
+                        # only reached with the default count, to know if
+                        # there are more results.
                         raise MoreResultsAvailable()
-                    else:
+                    yield sub
+                    if count and i - modif + 1 == count and not self._is_default_count:
                         return
-                yield sub
+        finally:
+            # Close the backend's generator now, so it stops fetching pages
+            # (it also happens when this generator is closed by BackendsCall).
+            if hasattr(res, 'close'):
+                res.close()
 
     def _do_complete(self, backend, count, selected_fields, function, *args, **kwargs):
         assert count is None or count > 0
@@ -141,6 +141,8 @@ class ReplApplication(Cmd, ConsoleApplication):
         results_options.add_option('-n', '--count', type='int',
                                    help='limit number of results (from each backends)')
         results_options.add_option('-s', '--select', help='select result item keys to display (comma separated)')
+        results_options.add_option('--timeout', type='float',
+                                   help='stop waiting for backends after this many seconds')
         self._parser.add_option_group(results_options)
 
         formatting_options = OptionGroup(self._parser, 'Formatting Options')
@@ -347,6 +349,8 @@ class ReplApplication(Cmd, ConsoleApplication):
                     kwargs['backends'].append(backend)
         else:
             kwargs['backends'] = backends
+        if self.options.timeout is not None:
+            kwargs.setdefault('timeout', self.options.timeout)
         fields = kwargs.pop('fields', self.selected_fields)
         if not fields and fields != []:
             fields = self.selected_fields
@@ -954,18 +958,11 @@ class ReplApplication(Cmd, ConsoleApplication):
 
     # First sort in alphabetical of backend
     # Second, sort with ID
-    def comp_object(self, obj1, obj2):
-        if obj1.backend == obj2.backend:
-            if obj1.id == obj2.id:
-                return 0
-            elif obj1.id > obj2.id:
-                return 1
-            else:
-                return -1
-        elif obj1.backend > obj2.backend:
-            return 1
-        else:
-            return -1
+    def sort_key(self, obj):
+        """
+        Get the key used to sort listed objects.
+        """
+        return obj.backend, obj.id
 
 
     @defaultcount(40)
@@ -1017,9 +1014,9 @@ class ReplApplication(Cmd, ConsoleApplication):
                     self._format_obj(res, only)
 
         if sort:
-            objects.sort(cmp=self.comp_object)
+            objects.sort(key=self.sort_key)
             collections = self._merge_collections_with_same_path(collections)
-            collections.sort(cmp=self.comp_object)
+            collections.sort(key=self.sort_key)
             for collection in collections:
                 self.formatter.format_collection(collection, only)
             for obj in objects:
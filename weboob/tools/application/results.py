@@ -17,7 +17,13 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
+import re
+from datetime import date, datetime, timedelta
+from operator import attrgetter
+
+import weboob.tools.date as date_utils
 from weboob.capabilities import UserError
+from weboob.capabilities.base import BaseObject
 
 
 __all__ = ['ResultsCondition', 'ResultsConditionError']
@@ -32,11 +38,62 @@ class ResultsConditionError(UserError):
     pass
 
 
+TIMEDELTA_REGEXP = re.compile(r'^\s*((?P<hours>\d+)\s*h)?\s*((?P<minutes>\d+)\s*m)?\s*((?P<seconds>\d+)\s*s)?\s*$')
+
+# Right value of a condition which can't be converted to the type of a field.
+_INVALID = object()
+
+
+def convert(text, typed):
+    """
+    Convert the right value of a condition, always given as string by the
+    application, to the type of the tested field.
+    """
+    if issubclass(typed, date_utils.date):
+        return date(*[int(x) for x in text.split('-')])
+    elif issubclass(typed, date_utils.datetime):
+        splitted_datetime = text.split(' ')
+        return datetime(*([int(x) for x in splitted_datetime[0].split('-')] +
+                          [int(x) for x in splitted_datetime[1].split(':')]))
+    elif issubclass(typed, timedelta):
+        time_dict = TIMEDELTA_REGEXP.match(text).groupdict()
+        return timedelta(seconds=int(time_dict['seconds'] or "0"),
+                         minutes=int(time_dict['minutes'] or "0"),
+                         hours=int(time_dict['hours'] or "0"))
+    else:
+        return typed(text)
+
+
 class Condition(object):
     def __init__(self, left, op, right):
         self.left = left  # Field of the object to test
         self.op = op
         self.right = right
+        self.function = functions[op]
+        # type of the tested values -> right value converted to this type
+        self.typed_right = {}
+
+    def evaluate(self, value):
+        typed = type(value)
+        try:
+            right = self.typed_right[typed]
+        except KeyError:
+            try:
+                right = convert(self.right, typed)
+            except Exception:
+                right = _INVALID
+            self.typed_right[typed] = right
+
+        if right is _INVALID:
+            return False
+        try:
+            return self.function(right, value)
+        except Exception:
+            return False
+
+    def evaluate_id(self, fullid, id):
+        # in the case of id, test id@backend and id
+        return self.function(self.right, fullid) or self.function(self.right, id)
 
 
 def is_egal(left, right):
@@ -61,6 +118,20 @@ def is_in(left, right):
 functions = {'!=': is_notegal, '=': is_egal, '>': is_sup, '<': is_inf, '|': is_in}
 
 
+def get_ids(obj):
+    if getattr(obj, 'id', None) is None:
+        raise KeyError('id')
+    return (obj.fullid if obj.backend is not None else obj.id), obj.id
+
+
+def get_dict_ids(obj):
+    return obj.to_dict()['id'], obj.id
+
+
+def get_missing(obj):
+    raise KeyError()
+
+
 class ResultsCondition(IResultsCondition):
     condition_str = None
 
@@ -96,46 +167,57 @@ class ResultsCondition(IResultsCondition):
             or_list.append(and_list)
         self.condition = or_list
         self.condition_str = condition_str
+        # class of objects -> conditions with the getters of their values
+        self.plans = {}
+
+    def compile(self, klass):
+        """
+        Get the conditions, with a getter of the tested value for each one,
+        to evaluate on objects of a class.
+
+        Values are read from the object attributes, except if the class
+        changes the output of :func:`BaseObject.to_dict`.
+        """
+        fields = getattr(klass, '_field_index', {})
+        plain = issubclass(klass, BaseObject) and \
+                klass.to_dict == BaseObject.to_dict and \
+                klass.iter_fields == BaseObject.iter_fields
+
+        plan = []
+        for _or in self.condition:
+            and_list = []
+            for condition in _or:
+                if condition.left == 'id':
+                    getter = get_ids if plain else get_dict_ids
+                elif not plain:
+                    getter = lambda obj, key=condition.left: obj.to_dict()[key]
+                elif condition.left in fields:
+                    getter = attrgetter(condition.left)
+                else:
+                    getter = get_missing
+                and_list.append((condition, getter))
+            plan.append(and_list)
+        return plan
 
     def is_valid(self, obj):
-        import weboob.tools.date as date_utils
-        import re
-        from datetime import date, datetime, timedelta
-        d = obj.to_dict()
+        try:
+            plan = self.plans[type(obj)]
+        except KeyError:
+            plan = self.plans[type(obj)] = self.compile(type(obj))
+
         # We evaluate all member of a list at each iteration.
-        for _or in self.condition:
+        for _or in plan:
             myeval = True
-            for condition in _or:
-                if condition.left in d:
-                    # in the case of id, test id@backend and id
-                    if condition.left == 'id':
-                        tocompare = condition.right
-                        evalfullid = functions[condition.op](tocompare, d['id'])
-                        evalid = functions[condition.op](tocompare, obj.id)
-                        myeval = evalfullid or evalid
-                    else:
-                        # We have to change the type of v, always gived as string by application
-                        typed = type(d[condition.left])
-                        try:
-                            if isinstance(d[condition.left], date_utils.date):
-                                tocompare = date(*[int(x) for x in condition.right.split('-')])
-                            elif isinstance(d[condition.left], date_utils.datetime):
-                                splitted_datetime = condition.right.split(' ')
-                                tocompare = datetime(*([int(x) for x in splitted_datetime[0].split('-')] +
-                                                       [int(x) for x in splitted_datetime[1].split(':')]))
-                            elif isinstance(d[condition.left], timedelta):
-                                time_dict = re.match('^\s*((?P<hours>\d+)\s*h)?\s*((?P<minutes>\d+)\s*m)?\s*((?P<seconds>\d+)\s*s)?\s*$',
-                                                     condition.right).groupdict()
-                                tocompare = timedelta(seconds=int(time_dict['seconds'] or "0"),
-                                                      minutes=int(time_dict['minutes'] or "0"),
-                                                      hours=int(time_dict['hours'] or "0"))
-                            else:
-                                tocompare = typed(condition.right)
-                            myeval = functions[condition.op](tocompare, d[condition.left])
-                        except:
-                            myeval = False
-                else:
+            for condition, getter in _or:
+                try:
+                    value = getter(obj)
+                except (KeyError, AttributeError):
                     raise ResultsConditionError(u'Field "%s" is not valid.' % condition.left)
+
+                if condition.left == 'id':
+                    myeval = condition.evaluate_id(*value)
+                else:
+                    myeval = condition.evaluate(value)
                 # Do not try all AND conditions if one is false
                 if not myeval:
                     break
@@ -30,6 +30,7 @@ from weboob.tools.log import getLogger
 from weboob.exceptions import ParseError
 from weboob.browser.elements import TableElement, ItemElement
 from weboob.browser.filters.standard import Filter, CleanText, CleanDecimal, TableCell
+from weboob.browser.url import literal_prefix
 
 
 __all__ = ['FrenchTransaction', 'AmericanTransaction']
@@ -43,12 +44,97 @@ class classproperty(object):
         return self.f(owner)
 
 
+class PatternsMatcher(object):
+    """
+    Find the first pattern of a list of ``(regexp, type)`` which matches a
+    label, as trying them one after the other would do.
+
+    Patterns are indexed by the first character of the labels they can
+    match, so those which start by another literal are not even tried.
+
+    >>> matcher = PatternsMatcher([(re.compile(r'^VIR(EMENT)? (?P<text>.*)'), 1),
+    ...                            (re.compile(r'^PRLV (?P<text>.*)'), 2),
+    ...                            (re.compile(r'^(?P<text>.*) CARTE \\d+'), 3)])
+    >>> m, _type = matcher.match(u'PRLV EDF')
+    >>> _type, m.group('text')
+    (2, u'EDF')
+    >>> matcher.match(u'PRLV CARTE 42')[1]
+    2
+    >>> matcher.match(u'SNCF CARTE 42')[1]
+    3
+    >>> matcher.match(u'RETRAIT')
+    (None, None)
+
+    :param patterns: list of (compiled regexp, type)
+    :type patterns: :class:`list`
+    """
+
+    def __init__(self, patterns):
+        self.source = patterns
+        self.size = len(patterns)
+
+        # patterns which may match a label starting by any character
+        default = []
+        # first character -> patterns which may match labels starting by it
+        table = {}
+
+        for pattern, _type in patterns:
+            candidate = (pattern.match, _type)
+            first = self.get_first_char(pattern)
+            if first is None:
+                default.append(candidate)
+                for candidates in table.values():
+                    candidates.append(candidate)
+            else:
+                table.setdefault(first, list(default)).append(candidate)
+
+        self.default = tuple(default)
+        self.table = dict((c, tuple(candidates)) for c, candidates in table.items())
+
+    @staticmethod
+    def get_first_char(pattern):
+        """
+        Get the character which starts every label matched by a regexp, or
+        None if it can't be known.
+        """
+        if pattern.flags & (re.IGNORECASE | re.VERBOSE):
+            return None
+
+        # match() is anchored, so a leading ^ is useless
+        prefix = literal_prefix(pattern.pattern.lstrip('^'))
+        if not prefix:
+            return None
+        if isinstance(prefix, bytes):
+            # a byte pattern compares its bytes with characters of a unicode
+            # label as if they were latin-1 ones
+            prefix = prefix.decode('latin-1')
+        return prefix[0]
+
+    def match(self, raw):
+        """
+        Get the first pattern which matches a label.
+
+        :param raw: label
+        :type raw: :class:`unicode`
+        :returns: the match object and the type of the pattern, or (None, None)
+        :rtype: :class:`tuple`
+        """
+        for match, _type in self.table.get(raw[:1], self.default):
+            m = match(raw)
+            if m:
+                return m, _type
+        return None, None
+
+
 class FrenchTransaction(Transaction):
     """
     Transaction with some helpers for french bank websites.
     """
     PATTERNS = []
 
+    # matcher of PATTERNS, built on the first use
+    _patterns_matcher = None
+
     def __init__(self, id='', *args, **kwargs):
         Transaction.__init__(self, id, *args, **kwargs)
         self._logger = getLogger('FrenchTransaction')
@@ -78,6 +164,29 @@ class FrenchTransaction(Transaction):
         else:
             self.amount = Decimal('0')
 
+    @classmethod
+    def match_pattern(klass, raw):
+        """
+        Get the first of :attr:`PATTERNS` which matches a label.
+
+        :returns: the match object and the type of the pattern, or (None, None)
+        :rtype: :class:`tuple`
+        """
+        matcher = klass._patterns_matcher
+        patterns = klass.PATTERNS
+        if matcher is None or matcher.source is not patterns or matcher.size != len(patterns):
+            # PATTERNS are defined by subclasses, and may even be changed
+            # after the class creation. Subclasses which keep the PATTERNS
+            # of their parent share its matcher.
+            matcher = klass._patterns_matcher = PatternsMatcher(patterns)
+
+        # same as matcher.match(raw), without another call
+        for match, _type in matcher.table.get(raw[:1], matcher.default):
+            m = match(raw)
+            if m:
+                return m, _type
+        return None, None
+
     def parse_date(self, date):
         if date is None:
             return NotAvailable
@@ -128,54 +237,51 @@ class FrenchTransaction(Transaction):
         else:
             self.label = self.raw
 
-        for pattern, _type in self.PATTERNS:
-            m = pattern.match(self.raw)
-            if m:
-                args = m.groupdict()
-
-                def inargs(key):
-                    """
-                    inner function to check if a key is in args,
-                    and is not None.
-                    """
-                    return args.get(key, None) is not None
-
-                self.type = _type
-                if inargs('text'):
-                    self.label = args['text'].strip()
-                if inargs('category'):
-                    self.category = args['category'].strip()
-
-                # Set date from information in raw label.
-                if inargs('dd') and inargs('mm'):
-                    dd = int(args['dd'])
-                    mm = int(args['mm'])
-
-                    if inargs('yy'):
-                        yy = int(args['yy'])
-                    else:
-                        d = self.date
-                        try:
-                            d = d.replace(month=mm, day=dd)
-                        except ValueError:
-                            d = d.replace(year=d.year-1, month=mm, day=dd)
-
-                        yy = d.year
-                        if d > self.date:
-                            yy -= 1
+        m, _type = self.match_pattern(self.raw)
+        if m:
+            args = m.groupdict()
+
+            def inargs(key):
+                """
+                inner function to check if a key is in args,
+                and is not None.
+                """
+                return args.get(key, None) is not None
+
+            self.type = _type
+            if inargs('text'):
+                self.label = args['text'].strip()
+            if inargs('category'):
+                self.category = args['category'].strip()
+
+            # Set date from information in raw label.
+            if inargs('dd') and inargs('mm'):
+                dd = int(args['dd'])
+                mm = int(args['mm'])
+
+                if inargs('yy'):
+                    yy = int(args['yy'])
+                else:
+                    d = self.date
+                    try:
+                        d = d.replace(month=mm, day=dd)
+                    except ValueError:
+                        d = d.replace(year=d.year-1, month=mm, day=dd)
 
-                    if yy < 100:
-                        yy += 2000
+                    yy = d.year
+                    if d > self.date:
+                        yy -= 1
 
-                    try:
-                        if inargs('HH') and inargs('MM'):
-                            self.rdate = datetime.datetime(yy, mm, dd, int(args['HH']), int(args['MM']))
-                        else:
-                            self.rdate = datetime.date(yy, mm, dd)
-                    except ValueError as e:
-                        self._logger.warning('Unable to date in label %r: %s' % (self.raw, e))
+                if yy < 100:
+                    yy += 2000
 
-                return
+                try:
+                    if inargs('HH') and inargs('MM'):
+                        self.rdate = datetime.datetime(yy, mm, dd, int(args['HH']), int(args['MM']))
+                    else:
+                        self.rdate = datetime.date(yy, mm, dd)
+                except ValueError as e:
+                    self._logger.warning('Unable to date in label %r: %s' % (self.raw, e))
 
     @classproperty
     def TransactionElement(k):
@@ -225,8 +331,6 @@ class FrenchTransaction(Transaction):
 
     @classmethod
     def Raw(klass, *args, **kwargs):
-        patterns = klass.PATTERNS
-
         class Filter(CleanText):
             def __call__(self, item):
                 raw = super(Filter, self).__call__(item)
@@ -238,54 +342,51 @@ class FrenchTransaction(Transaction):
                 else:
                     item.obj.label = raw
 
-                for pattern, _type in patterns:
-                    m = pattern.match(raw)
-                    if m:
-                        args = m.groupdict()
-
-                        def inargs(key):
-                            """
-                            inner function to check if a key is in args,
-                            and is not None.
-                            """
-                            return args.get(key, None) is not None
-
-                        item.obj.type = _type
-                        if inargs('text'):
-                            item.obj.label = args['text'].strip()
-                        if inargs('category'):
-                            item.obj.category = args['category'].strip()
-
-                        # Set date from information in raw label.
-                        if inargs('dd') and inargs('mm'):
-                            dd = int(args['dd'])
-                            mm = int(args['mm'])
-
-                            if inargs('yy'):
-                                yy = int(args['yy'])
-                            else:
-                                d = item.obj.date
-                                try:
-                                    d = d.replace(month=mm, day=dd)
-                                except ValueError:
-                                    d = d.replace(year=d.year-1, month=mm, day=dd)
-
-                                yy = d.year
-                                if d > item.obj.date:
-                                    yy -= 1
+                m, _type = klass.match_pattern(raw)
+                if m:
+                    args = m.groupdict()
+
+                    def inargs(key):
+                        """
+                        inner function to check if a key is in args,
+                        and is not None.
+                        """
+                        return args.get(key, None) is not None
+
+                    item.obj.type = _type
+                    if inargs('text'):
+                        item.obj.label = args['text'].strip()
+                    if inargs('category'):
+                        item.obj.category = args['category'].strip()
+
+                    # Set date from information in raw label.
+                    if inargs('dd') and inargs('mm'):
+                        dd = int(args['dd'])
+                        mm = int(args['mm'])
+
+                        if inargs('yy'):
+                            yy = int(args['yy'])
+                        else:
+                            d = item.obj.date
+                            try:
+                                d = d.replace(month=mm, day=dd)
+                            except ValueError:
+                                d = d.replace(year=d.year-1, month=mm, day=dd)
 
-                            if yy < 100:
-                                yy += 2000
+                            yy = d.year
+                            if d > item.obj.date:
+                                yy -= 1
 
-                            try:
-                                if inargs('HH') and inargs('MM'):
-                                    item.obj.rdate = datetime.datetime(yy, mm, dd, int(args['HH']), int(args['MM']))
-                                else:
-                                    item.obj.rdate = datetime.date(yy, mm, dd)
-                            except ValueError as e:
-                                raise ParseError('Unable to date in label %r: %s' % (raw, e))
+                        if yy < 100:
+                            yy += 2000
 
-                        break
+                        try:
+                            if inargs('HH') and inargs('MM'):
+                                item.obj.rdate = datetime.datetime(yy, mm, dd, int(args['HH']), int(args['MM']))
+                            else:
+                                item.obj.rdate = datetime.date(yy, mm, dd)
+                        except ValueError as e:
+                            raise ParseError('Unable to date in label %r: %s' % (raw, e))
 
                 return raw
 
@@ -356,3 +457,28 @@ def test():
     decimal_amount = AmericanTransaction.decimal_amount
     assert decimal_amount('$12,442.12 USD') == Decimal('12442.12')
     assert decimal_amount('') == Decimal('0')
+
+
+def test_patterns_matcher():
+    patterns = [(re.compile(r'^VIR(EMENT)? (?P<text>.*)'), 'transfer'),
+                (re.compile(r'^PRLV (?P<text>.*)'), 'order'),
+                (re.compile(r'^prlv europeen (?P<text>.*)', re.IGNORECASE), 'sepa'),
+                (re.compile(r'^(?P<text>.*) CARTE \d+ PAIEMENT CB (?P<dd>\d{2})(?P<mm>\d{2})'), 'card'),
+                (re.compile(r'^PRÉLÈVEMENT (?P<text>.*)'), 'order'),
+                (re.compile(u'^RETRAIT DAB (?P<text>.*)'), 'withdrawal'),
+                (re.compile(r'^V?RETRAIT (?P<text>.*)'), 'withdrawal'),
+               ]
+    labels = [u'VIR SALAIRE', u'VIREMENT LOYER', u'VIRTUAL', u'PRLV EDF', u'PRLV EUROPEEN GDF',
+              u'Prlv Europeen GDF', u'SNCF CARTE 42 PAIEMENT CB 0102', u'PRLV X CARTE 42 PAIEMENT CB 0102',
+              u'PRÉLÈVEMENT EDF', u'RETRAIT DAB PARIS', u'VRETRAIT PARIS', u'RETRAIT', u'', u' VIR']
+
+    matcher = PatternsMatcher(patterns)
+    for raw in labels:
+        expected = None, None
+        for pattern, _type in patterns:
+            m = pattern.match(raw)
+            if m:
+                expected = m.groupdict(), _type
+                break
+        m, _type = matcher.match(raw)
+        assert (m and m.groupdict(), _type) == expected, raw
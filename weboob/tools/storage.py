@@ -18,9 +18,20 @@
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
 
+import os
+import tempfile
 from copy import deepcopy
+from threading import Lock, RLock, Timer
 
-from .config.yamlconfig import YamlConfig
+import yaml
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from weboob.capabilities.base import _IMMUTABLE_TYPES
+
+from .config.yamlconfig import YamlConfig, Loader, WeboobDumper
 
 
 class IStorage(object):
@@ -54,6 +65,13 @@ class IStorage(object):
         """
         raise NotImplementedError()
 
+    def flush(self):
+        """
+        Write on the disk changes which have been saved but not written yet.
+
+        Storages which write changes in :func:`save` have nothing to do.
+        """
+
 
 class StandardStorage(IStorage):
     def __init__(self, path):
@@ -81,3 +99,521 @@ class StandardStorage(IStorage):
 
     def get(self, what, name, *args, **kwargs):
         return self.config.get(what, name, *args, **kwargs)
+
+
+class BufferedStorage(StandardStorage):
+    """
+    Storage which delays writes on the disk.
+
+    :func:`save` only marks data as modified. Changes are written at most
+    once every *delay* seconds, and by :func:`flush`, which is called when
+    :class:`weboob.core.ouiboube.Weboob` is deinitialized.
+
+    The tree of a backend (or application) is copied when :func:`save` is
+    called, in the thread which has changed it, and this copy is written
+    later. So values returned by :func:`get` can still be changed in place,
+    without a lock, while a flush is running; changes which have not been
+    saved are not written.
+
+    If *sharded* is True, *path* is a directory, and data of each backend
+    (or application) is stored in its own file, so saving it does not
+    rewrite data of the other ones.
+
+    :param path: path of the file, or of the directory if sharded
+    :type path: :class:`str`
+    :param delay: maximum delay in seconds before writing changes; if None,
+                  they are only written by :func:`flush`
+    :type delay: :class:`float`
+    :param sharded: use a file for each backend
+    :type sharded: :class:`bool`
+    :param fsync: force writing files on the device
+    :type fsync: :class:`bool`
+    """
+
+    def __init__(self, path, delay=5, sharded=False, fsync=False):
+        self.delay = delay
+        self.sharded = sharded
+        self.fsync = fsync
+        self.lock = RLock()
+        # only one flush at a time, so files are never overwritten with
+        # older data
+        self.flush_lock = Lock()
+        self.dirty = set()
+        self.timer = None
+
+        if sharded:
+            self.config = YamlConfig(path)
+            self.config.values = self._load_shards(path)
+        else:
+            super(BufferedStorage, self).__init__(path)
+
+        # what -> name -> copy of the tree when it has been saved. Copies
+        # are replaced on save, never changed.
+        self.saved = deepcopy(self.config.values)
+
+    def _load_shards(self, path):
+        values = {}
+        if not os.path.isdir(path):
+            return values
+
+        for what in os.listdir(path):
+            if not os.path.isdir(os.path.join(path, what)):
+                continue
+            values[what] = {}
+            for filename in os.listdir(os.path.join(path, what)):
+                if not filename.endswith('.yaml'):
+                    continue
+                with open(os.path.join(path, what, filename), 'r') as f:
+                    values[what][filename[:-5]] = yaml.load(f, Loader=Loader) or {}
+        return values
+
+    def _shard_path(self, what, name):
+        return os.path.join(self.config.path, what, '%s.yaml' % name)
+
+    def load(self, what, name, default={}):
+        with self.lock:
+            super(BufferedStorage, self).load(what, name, default)
+
+    def set(self, what, name, *args):
+        with self.lock:
+            super(BufferedStorage, self).set(what, name, *args)
+
+    def delete(self, what, name, *args):
+        with self.lock:
+            super(BufferedStorage, self).delete(what, name, *args)
+
+    def save(self, what, name):
+        with self.lock:
+            tree = (self.config.values.get(what) or {}).get(name)
+            if tree is None:
+                # the backend has been deleted
+                self.saved.get(what, {}).pop(name, None)
+            else:
+                self.saved.setdefault(what, {})[name] = deepcopy(tree)
+
+            self.dirty.add((what, name))
+            if self.delay and self.timer is None:
+                self.timer = Timer(self.delay, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+        if self.delay == 0:
+            self.flush()
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+                if not self.dirty:
+                    return
+
+                if self.sharded:
+                    files = [(self._shard_path(what, name), self.saved.get(what, {}).get(name))
+                             for what, name in self.dirty]
+                else:
+                    files = [(self.config.path, dict((what, dict(trees)) for what, trees in self.saved.items()))]
+                self.dirty.clear()
+
+            # files are written without the lock, so other threads can
+            # still use the storage
+            for path, values in files:
+                if values is None:
+                    # the backend has been deleted
+                    if os.path.exists(path):
+                        os.remove(path)
+                else:
+                    self._write(path, values)
+
+    def _write(self, path, values):
+        dirname = os.path.dirname(path)
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        # write in a temporary file to avoid corruption problems
+        with tempfile.NamedTemporaryFile(dir=dirname, delete=False) as f:
+            yaml.dump(values, f, Dumper=WeboobDumper, default_flow_style=False)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.rename(f.name, path)
+
+
+class _TrackedDict(dict):
+    """
+    Dict which records its keys which are set or removed, so
+    :class:`SQLiteStorage` knows which items have changed.
+
+    It is pickled and copied as a dict.
+    """
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self.changed = set()
+        # _DictRows which knows the state of the database when changed was
+        # cleared
+        self.rows = None
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self.changed.add(key)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self.changed.add(key)
+
+    def pop(self, key, *default):
+        self.changed.add(key)
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        self.changed.add(key)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        self.changed.add(key)
+        return dict.setdefault(self, key, default)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        self.changed.update(self)
+        dict.clear(self)
+
+
+class _DictRows(object):
+    """
+    Rows of :class:`SQLiteStorage` which contain the items of a dict, each
+    with about :attr:`BUCKET_SIZE` items, as they are in the database.
+    """
+
+    BUCKET_SIZE = 1000
+
+    IMMUTABLE = frozenset(_IMMUTABLE_TYPES)
+
+    def __init__(self):
+        # item -> bucket
+        self.location = {}
+        # bucket -> set of items
+        self.members = {}
+        # bucket -> pickled dict of its items
+        self.blobs = {}
+        # buckets with values which may be changed in place
+        self.mutable = set()
+
+    def _check_mutable(self, bucket, items):
+        if not self.IMMUTABLE.issuperset(map(type, items.values())):
+            self.mutable.add(bucket)
+        else:
+            self.mutable.discard(bucket)
+
+    def add(self, bucket, blob):
+        """
+        Read a row of the database, and return its items.
+        """
+        items = pickle.loads(blob)
+        self.blobs[bucket] = blob
+        self.members[bucket] = set(items)
+        self.location.update(dict.fromkeys(items, bucket))
+        self._check_mutable(bucket, items)
+        return items
+
+    def diff(self, value):
+        """
+        Find the rows which have to be written to store a dict.
+
+        :returns: (bucket, pickled items) of rows to write, and buckets of
+                  rows to delete
+        """
+        if isinstance(value, _TrackedDict) and value.rows is self:
+            changed = value.changed
+            dirty = set(self.mutable)
+        else:
+            # do not know what has changed, check everything
+            changed = set(value) | set(self.location)
+            dirty = set()
+
+        count = max(1, len(value) // self.BUCKET_SIZE)
+        location = self.location
+        for item in changed:
+            bucket = location.get(item)
+            if item in value:
+                if bucket is None:
+                    bucket = hash(item) % count
+                    location[item] = bucket
+                    self.members.setdefault(bucket, set()).add(item)
+                dirty.add(bucket)
+            elif bucket is not None:
+                del location[item]
+                self.members[bucket].discard(item)
+                dirty.add(bucket)
+
+        if isinstance(value, _TrackedDict):
+            value.changed.clear()
+            value.rows = self
+
+        rows = []
+        removed = []
+        for bucket in dirty:
+            items = dict((item, value[item]) for item in self.members[bucket])
+            if not items:
+                del self.members[bucket]
+                self.mutable.discard(bucket)
+                if self.blobs.pop(bucket, None) is not None:
+                    removed.append(bucket)
+                continue
+
+            blob = pickle.dumps(items, 2)
+            if self.blobs.get(bucket) != blob:
+                self.blobs[bucket] = blob
+                rows.append((bucket, blob))
+            self._check_mutable(bucket, items)
+        return rows, removed
+
+
+class SQLiteStorage(IStorage):
+    """
+    Storage in a SQLite database.
+
+    Each top-level key of a backend (or application) tree is stored in its
+    own rows, so only keys which are used are read. When the value of a key
+    is a dict, its items are spread in rows of about a thousand items, and
+    :func:`save` only writes rows whose items have changed: adding an ID to
+    a dict of seen IDs rewrites one row. Other values (like a list of seen
+    IDs) are rewritten as a whole when they change.
+
+    To know which items have changed, dicts read from the database (or
+    from the default tree) are returned by :func:`get` as a subclass of
+    dict which records changed keys. Rows of items which may be changed in
+    place, like lists or dicts, are compared on every save. A dict given to
+    :func:`set` is not tracked, so every save compares all its items.
+
+    Values returned by :func:`get` are kept in memory until the storage is
+    loaded again, so changing them in place and calling :func:`save` works
+    as with :class:`StandardStorage`. Top-level keys have to be strings.
+
+    :param path: path of the database
+    :type path: :class:`str`
+    """
+
+    # value of the row of a dict, whose items are in other rows
+    DICT_ROW = pickle.dumps({}, 2)
+
+    def __init__(self, path):
+        import sqlite3
+        self.binary = sqlite3.Binary
+        self.path = path
+        self.lock = RLock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.text_factory = str
+        self.db.execute('PRAGMA journal_mode=WAL')
+        # bucket is -1 for the row of the value itself, or the number of a
+        # row of items of a dict
+        self.db.execute('CREATE TABLE IF NOT EXISTS storage ('
+                        '   what TEXT NOT NULL, name TEXT NOT NULL, key TEXT NOT NULL,'
+                        '   bucket INTEGER NOT NULL, value BLOB NOT NULL,'
+                        '   PRIMARY KEY (what, name, key, bucket))')
+        self.db.commit()
+
+        # (what, name) -> default tree given to load()
+        self.defaults = {}
+        # (what, name) -> {key: value} of keys which have been read or set
+        self.cache = {}
+        # (what, name) -> {key: (pickled value, rows)}, as it is in the
+        # database. For a dict, the value is DICT_ROW and rows is a
+        # _DictRows; otherwise rows is None.
+        self.stored = {}
+        # (what, name) -> keys to remove from the database
+        self.deleted = {}
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def _fetch(self, what, name, key):
+        cache = self.cache.setdefault((what, name), {})
+        if key in cache:
+            return cache[key]
+        if key in self.deleted.get((what, name), ()):
+            raise KeyError(key)
+
+        rows = self.db.execute('SELECT bucket, value FROM storage WHERE what = ? AND name = ? AND key = ?',
+                               (what, name, key)).fetchall()
+        if rows:
+            blob = None
+            buckets = []
+            for bucket, data in rows:
+                if bucket < 0:
+                    blob = bytes(data)
+                else:
+                    buckets.append((bucket, bytes(data)))
+
+            if blob == self.DICT_ROW:
+                dict_rows = _DictRows()
+                value = _TrackedDict()
+                for bucket, data in buckets:
+                    dict.update(value, dict_rows.add(bucket, data))
+                value.rows = dict_rows
+            else:
+                value = pickle.loads(blob)
+                dict_rows = None
+            self.stored.setdefault((what, name), {})[key] = (blob, dict_rows)
+        else:
+            default = self.defaults.get((what, name), {})
+            if key not in default:
+                raise KeyError(key)
+            value = deepcopy(default[key])
+            if type(value) is dict:
+                value = _TrackedDict(value)
+
+        cache[key] = value
+        return value
+
+    def _fetch_all(self, what, name):
+        keys = set(self.defaults.get((what, name), {}))
+        keys.update(key for key, in self.db.execute('SELECT DISTINCT key FROM storage WHERE what = ? AND name = ?',
+                                                    (what, name)))
+        keys.update(self.cache.get((what, name), {}))
+
+        values = {}
+        for key in keys:
+            try:
+                values[key] = self._fetch(what, name, key)
+            except KeyError:
+                pass
+        return values
+
+    def _view(self, what, name, key):
+        # Get a tree which contains only the needed top-level key, on
+        # which YamlConfig methods can be used.
+        if key is None:
+            view = self._fetch_all(what, name)
+        else:
+            view = {}
+            try:
+                view[key] = self._fetch(what, name, key)
+            except KeyError:
+                pass
+
+        config = YamlConfig(self.path)
+        config.values = {what: {name: view}}
+        return config, view, set(view)
+
+    def _update(self, what, name, config, view, keys):
+        # Report changes made on a view, which contained the given keys.
+        cache = self.cache.setdefault((what, name), {})
+        deleted = self.deleted.setdefault((what, name), set())
+
+        tree = config.values[what].get(name)
+        if tree is not view:
+            # the whole tree has been replaced or removed
+            deleted.update(self._fetch_all(what, name))
+            self.defaults.pop((what, name), None)
+            cache.clear()
+            view = tree or {}
+            keys = set(view)
+        else:
+            keys |= set(view)
+
+        for key in keys:
+            if key in view:
+                cache[key] = view[key]
+                deleted.discard(key)
+            elif key in cache:
+                del cache[key]
+                deleted.add(key)
+
+    def load(self, what, name, default={}):
+        with self.lock:
+            self.defaults[(what, name)] = default
+            # forget changes which have not been saved
+            self.cache.pop((what, name), None)
+            self.deleted.pop((what, name), None)
+
+    def _diff(self, key, value, stored):
+        # Find rows to write, and buckets of rows to remove (None for all
+        # of them), to store the value of a key.
+        blob, dict_rows = stored.get(key, (None, None))
+        if not isinstance(value, dict) or type(value) not in (dict, _TrackedDict):
+            data = pickle.dumps(value, 2)
+            stored[key] = (data, None)
+            rows = [(-1, data)] if data != blob else []
+            return rows, [None] if dict_rows is not None else []
+
+        if dict_rows is None:
+            dict_rows = _DictRows()
+        rows, removed = dict_rows.diff(value)
+        if blob != self.DICT_ROW:
+            rows.append((-1, self.DICT_ROW))
+        stored[key] = (self.DICT_ROW, dict_rows)
+        return rows, removed
+
+    def save(self, what, name):
+        with self.lock:
+            stored = self.stored.setdefault((what, name), {})
+            deleted = self.deleted.pop((what, name), set())
+
+            rows = []
+            removed = []
+            for key, value in self.cache.get((what, name), {}).items():
+                key_rows, key_removed = self._diff(key, value, stored)
+                rows.extend((key, bucket, data) for bucket, data in key_rows)
+                removed.extend((key, bucket) for bucket in key_removed)
+
+            with self.db:
+                self.db.executemany('DELETE FROM storage WHERE what = ? AND name = ? AND key = ?',
+                                    [(what, name, key) for key in deleted])
+                self.db.executemany('DELETE FROM storage WHERE what = ? AND name = ? AND key = ? AND bucket >= 0',
+                                    [(what, name, key) for key, bucket in removed if bucket is None])
+                self.db.executemany('DELETE FROM storage WHERE what = ? AND name = ? AND key = ? AND bucket = ?',
+                                    [(what, name, key, bucket) for key, bucket in removed if bucket is not None])
+                self.db.executemany('INSERT OR REPLACE INTO storage (what, name, key, bucket, value) '
+                                    'VALUES (?, ?, ?, ?, ?)',
+                                    [(what, name, key, bucket, self.binary(data)) for key, bucket, data in rows])
+
+            for key in deleted:
+                stored.pop(key, None)
+
+    def set(self, what, name, *args):
+        with self.lock:
+            config, view, keys = self._view(what, name, args[0] if len(args) > 1 else None)
+            config.set(what, name, *args)
+            self._update(what, name, config, view, keys)
+
+    def delete(self, what, name, *args):
+        with self.lock:
+            config, view, keys = self._view(what, name, args[0] if args else None)
+            config.delete(what, name, *args)
+            self._update(what, name, config, view, keys)
+
+    def get(self, what, name, *args, **kwargs):
+        with self.lock:
+            config, view, keys = self._view(what, name, args[0] if args else None)
+            value = config.get(what, name, *args, **kwargs)
+            # a path may have been created to return the default value
+            self._update(what, name, config, view, keys)
+            return value
+
+
+def migrate_storage(source, dest):
+    """
+    Copy everything stored in a :class:`StandardStorage` to another storage.
+
+    :param source: storage to read
+    :type source: :class:`StandardStorage`
+    :param dest: storage to write
+    :type dest: :class:`IStorage`
+    """
+    for what, names in source.config.values.items():
+        for name, tree in (names or {}).items():
+            dest.load(what, name, {})
+            for key, value in (tree or {}).items():
+                dest.set(what, name, key, value)
+            dest.save(what, name)
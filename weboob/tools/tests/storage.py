@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2015 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+from copy import deepcopy
+from datetime import datetime
+from threading import Thread
+from time import sleep, time
+from unittest import TestCase
+
+from weboob.core.ouiboube import WebNip
+from weboob.tools.compat import basestring
+from weboob.tools.storage import StandardStorage, BufferedStorage, SQLiteStorage, migrate_storage
+
+
+class BufferedStorageTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'storage.yaml')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def stored(self, *path):
+        storage = StandardStorage(self.path)
+        return storage.get(*path, default=None)
+
+    def test_save_is_delayed_until_flush(self):
+        storage = BufferedStorage(self.path, delay=None)
+        storage.load('backends', 'first', {})
+        storage.set('backends', 'first', 'seen', {'1': True})
+        storage.save('backends', 'first')
+        storage.set('backends', 'first', 'seen', '2', True)
+        storage.save('backends', 'first')
+        self.assertIsNone(self.stored('backends', 'first'))
+
+        storage.flush()
+        self.assertEqual(self.stored('backends', 'first', 'seen'), {'1': True, '2': True})
+
+    def test_delayed_flush(self):
+        storage = BufferedStorage(self.path, delay=0.5)
+        storage.load('backends', 'first', {})
+        storage.set('backends', 'first', 'key', 'value')
+        storage.save('backends', 'first')
+        self.assertIsNone(self.stored('backends', 'first'))
+
+        end = time() + 5
+        while storage.timer is not None and time() < end:
+            sleep(0.01)
+        self.assertEqual(self.stored('backends', 'first', 'key'), 'value')
+
+    def test_flush_on_deinit(self):
+        storage = BufferedStorage(self.path, delay=None)
+        weboob = WebNip(modules_path='', storage=storage)
+        storage.load('backends', 'first', {})
+        storage.set('backends', 'first', 'key', 'value')
+        storage.save('backends', 'first')
+
+        weboob.deinit()
+        self.assertEqual(self.stored('backends', 'first', 'key'), 'value')
+
+    def test_only_saved_changes_are_written(self):
+        storage = BufferedStorage(self.path, delay=None)
+        storage.load('backends', 'first', {})
+        storage.load('backends', 'second', {})
+        storage.set('backends', 'first', 'seen', {})
+        seen = storage.get('backends', 'first', 'seen')
+        seen['1'] = True
+        storage.save('backends', 'first')
+        seen['2'] = True
+        storage.set('backends', 'second', 'key', 'value')
+
+        storage.flush()
+        self.assertEqual(self.stored('backends', 'first', 'seen'), {'1': True})
+        self.assertIsNone(self.stored('backends', 'second'))
+
+    def test_values_changed_during_flush(self):
+        storage = BufferedStorage(self.path, delay=None)
+        storage.load('backends', 'first', {'seen': dict((str(i), True) for i in range(5000))})
+        seen = storage.get('backends', 'first', 'seen')
+        running = [True]
+
+        def change():
+            # as a module does, without the lock of the storage
+            i = 5000
+            while running[0]:
+                seen[str(i)] = True
+                del seen[str(i - 5000)]
+                if i % 100 == 0:
+                    storage.save('backends', 'first')
+                i += 1
+
+        thread = Thread(target=change)
+        thread.start()
+        try:
+            end = time() + 0.5
+            while time() < end:
+                storage.flush()
+        finally:
+            running[0] = False
+            thread.join()
+
+        storage.save('backends', 'first')
+        storage.flush()
+        self.assertEqual(self.stored('backends', 'first', 'seen'), seen)
+
+    def test_sharded(self):
+        path = os.path.join(self.tmpdir, 'storage')
+        storage = BufferedStorage(path, delay=None, sharded=True)
+        for name in ('first', 'second'):
+            storage.load('backends', name, {})
+            storage.set('backends', name, 'key', name)
+            storage.save('backends', name)
+        storage.load('applications', 'boobank', {})
+        storage.set('applications', 'boobank', 'key', 'value')
+        storage.save('applications', 'boobank')
+        storage.flush()
+
+        first = os.path.join(path, 'backends', 'first.yaml')
+        self.assertEqual(sorted(os.listdir(os.path.join(path, 'backends'))), ['first.yaml', 'second.yaml'])
+        self.assertEqual(os.listdir(os.path.join(path, 'applications')), ['boobank.yaml'])
+
+        # only files of saved backends are written
+        os.remove(first)
+        storage.set('backends', 'second', 'key', 'changed')
+        storage.save('backends', 'second')
+        storage.flush()
+        self.assertFalse(os.path.exists(first))
+
+        storage = BufferedStorage(path, delay=None, sharded=True)
+        self.assertEqual(storage.get('backends', 'second', 'key'), 'changed')
+        self.assertEqual(storage.get('applications', 'boobank', 'key'), 'value')
+
+        storage.delete('backends', 'second')
+        storage.save('backends', 'second')
+        storage.flush()
+        self.assertEqual(os.listdir(os.path.join(path, 'backends')), [])
+
+
+class SQLiteStorageTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'storage.db')
+        self.storage = self.open()
+
+    def tearDown(self):
+        self.storage.close()
+        shutil.rmtree(self.tmpdir)
+
+    def open(self):
+        storage = SQLiteStorage(self.path)
+        storage.load('backends', 'first', {'seen': {}})
+        return storage
+
+    def reopen(self):
+        self.storage.close()
+        self.storage = self.open()
+        return self.storage
+
+    def changes(self, function, *args):
+        # number of rows written or deleted
+        before = self.storage.db.total_changes
+        function(*args)
+        return self.storage.db.total_changes - before
+
+    def test_default(self):
+        self.assertEqual(self.storage.get('backends', 'first'), {'seen': {}})
+        self.assertEqual(self.storage.get('backends', 'first', 'other', default=1), 1)
+        self.assertEqual(self.storage.db.execute('SELECT COUNT(*) FROM storage').fetchone()[0], 0)
+
+    def test_values(self):
+        date = datetime(2015, 3, 1, 12, 30)
+        self.storage.set('backends', 'first', 'seen', 'a', date)
+        self.storage.set('backends', 'first', 'list', [1, 2])
+        self.storage.set('backends', 'first', 'config', 'threads', 10)
+        self.storage.save('backends', 'first')
+
+        storage = self.reopen()
+        self.assertEqual(storage.get('backends', 'first', 'seen'), {'a': date})
+        self.assertEqual(storage.get('backends', 'first', 'list'), [1, 2])
+        self.assertEqual(storage.get('backends', 'first', 'config', 'threads'), 10)
+        self.assertEqual(storage.get('backends', 'first'),
+                         {'seen': {'a': date}, 'list': [1, 2], 'config': {'threads': 10}})
+        self.assertIsNone(storage.get('backends', 'second', 'seen', default=None))
+
+    def test_unsaved_changes_are_forgotten(self):
+        self.storage.set('backends', 'first', 'seen', 'a', True)
+        self.storage.save('backends', 'first')
+        self.storage.set('backends', 'first', 'seen', 'b', True)
+        self.storage.load('backends', 'first', {'seen': {}})
+        self.assertEqual(self.storage.get('backends', 'first', 'seen'), {'a': True})
+
+    def test_only_changed_rows_are_written(self):
+        self.storage.set('backends', 'first', 'seen', dict((str(i), True) for i in range(10000)))
+        self.storage.set('backends', 'first', 'list', list(range(10)))
+        self.storage.save('backends', 'first')
+
+        storage = self.reopen()
+        self.assertEqual(len(storage.get('backends', 'first', 'seen')), 10000)
+        self.assertEqual(self.changes(storage.save, 'backends', 'first'), 0)
+
+        storage.set('backends', 'first', 'seen', 'new', True)
+        self.assertEqual(self.changes(storage.save, 'backends', 'first'), 1)
+
+        storage.delete('backends', 'first', 'seen', '42')
+        storage.get('backends', 'first', 'seen')['43'] = False
+        self.assertLessEqual(self.changes(storage.save, 'backends', 'first'), 2)
+
+        storage.get('backends', 'first', 'list').append(10)
+        self.assertEqual(self.changes(storage.save, 'backends', 'first'), 1)
+
+        seen = self.reopen().get('backends', 'first', 'seen')
+        self.assertEqual(len(seen), 10000)
+        self.assertNotIn('42', seen)
+        self.assertIs(seen['43'], False)
+        self.assertIs(seen['new'], True)
+        self.assertEqual(self.storage.get('backends', 'first', 'list'), list(range(11)))
+
+    def test_values_changed_in_place(self):
+        self.storage.set('backends', 'first', 'contacts', {'1': {'lastmsg': 0}})
+        self.storage.save('backends', 'first')
+        contacts = self.storage.get('backends', 'first', 'contacts')
+        # a dict given to set() is not tracked
+        contacts['2'] = {'lastmsg': 0}
+        self.storage.save('backends', 'first')
+
+        storage = self.reopen()
+        contacts = storage.get('backends', 'first', 'contacts')
+        self.assertEqual(contacts, {'1': {'lastmsg': 0}, '2': {'lastmsg': 0}})
+        contacts['1']['lastmsg'] = 42
+        storage.get('backends', 'first', 'seen').update({'a': True})
+        storage.save('backends', 'first')
+
+        storage = self.reopen()
+        self.assertEqual(storage.get('backends', 'first', 'contacts', '1'), {'lastmsg': 42})
+        self.assertEqual(storage.get('backends', 'first', 'seen'), {'a': True})
+
+    def test_replace_and_delete(self):
+        self.storage.set('backends', 'first', 'seen', dict((str(i), i) for i in range(3000)))
+        self.storage.save('backends', 'first')
+        self.storage.set('backends', 'first', 'seen', ['a'])
+        self.storage.save('backends', 'first')
+        self.assertEqual(self.reopen().get('backends', 'first', 'seen'), ['a'])
+        self.assertEqual(self.storage.db.execute('SELECT COUNT(*) FROM storage').fetchone()[0], 1)
+
+        self.storage.set('backends', 'first', 'seen', {'b': 1})
+        self.storage.set('backends', 'first', 'other', 1)
+        self.storage.save('backends', 'first')
+        self.storage.get('backends', 'first', 'seen').clear()
+        self.storage.delete('backends', 'first', 'other')
+        self.storage.save('backends', 'first')
+        self.assertEqual(self.reopen().get('backends', 'first'), {'seen': {}})
+
+        self.storage.delete('backends', 'first')
+        self.storage.save('backends', 'first')
+        self.assertEqual(self.storage.db.execute('SELECT COUNT(*) FROM storage').fetchone()[0], 0)
+
+    def test_returned_dicts_are_dicts(self):
+        self.storage.set('backends', 'first', 'seen', 'a', [1])
+        seen = self.storage.get('backends', 'first', 'seen')
+        self.assertIsInstance(seen, dict)
+
+        copy = deepcopy(seen)
+        self.assertIs(type(copy), dict)
+        self.assertEqual(copy, {'a': [1]})
+        self.assertIsNot(copy['a'], seen['a'])
+
+    def test_migrate(self):
+        source = StandardStorage(os.path.join(self.tmpdir, 'storage.yaml'))
+        source.load('backends', 'first', {})
+        source.set('backends', 'first', 'seen', dict((str(i), True) for i in range(2500)))
+        source.load('applications', 'boobank', {})
+        source.set('applications', 'boobank', 'key', u'value')
+
+        migrate_storage(source, self.storage)
+        storage = self.reopen()
+        storage.load('applications', 'boobank', {})
+        self.assertEqual(storage.get('backends', 'first', 'seen'), source.get('backends', 'first', 'seen'))
+        self.assertEqual(storage.get('applications', 'boobank', 'key'), u'value')
+        self.assertIsInstance(storage.get('applications', 'boobank', 'key'), basestring)